@@ -0,0 +1,206 @@
+"""Per-stage benchmarks for Fletcher over the bundled river fixtures.
+
+Times CSV parse, LTTB, _render_latest_image, the four render_* encoders and JSON
+serialization on the fixture CSVs, plus synthetic series scaled up to millions of
+rows (parse and LTTB only; rendering always works on 200 points).
+
+render/* and station/* stages clear the warm-container caches (render_image's fonts,
+layout, static layer and tile caches, glyph_atlas's atlases, river_data's downsample
+memo) before every timed call, so they include loading the fonts and building their
+atlases as a cold Lambda would; *_warm/* stages time the same calls with the caches
+left to fill, as a warm Lambda re-rendering the same data.
+
+    python Fletcher-tests/benchmarks/bench_fletcher.py                      # compare to baselines
+    python Fletcher-tests/benchmarks/bench_fletcher.py --update-baselines   # record new baselines
+
+Each stage is the median of --repeat runs. Exits 1 if any stage is slower than its
+baseline by more than --tolerance; stages under --min-ms are held to that floor instead.
+Baselines are machine-specific: record them all in one run, on the machine you compare on.
+"""
+
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(os.path.dirname(HERE))
+LAMBDA_DIR = os.path.join(REPO_ROOT, "Fletcher", "lambda")
+TEST_DATA_DIR = os.path.join(REPO_ROOT, "Fletcher-tests", "testData")
+EXAMPLE_DATA_DIR = os.path.join(REPO_ROOT, "Fletcher", "ExampleData")
+DEFAULT_BASELINES = os.path.join(HERE, "baselines.json")
+
+sys.path.insert(0, LAMBDA_DIR)
+
+import glyph_atlas  # noqa: E402
+import river_config  # noqa: E402
+import river_data  # noqa: E402
+import render_image  # noqa: E402
+from LTTBalgrithm import largest_triangle_three_buckets  # noqa: E402
+
+THRESHOLD = 200
+
+
+def _fixture_files():
+    files = []
+    for d in (TEST_DATA_DIR, EXAMPLE_DATA_DIR):
+        for name in sorted(os.listdir(d)):
+            if name.endswith(".csv"):
+                files.append(os.path.join(d, name))
+    return files
+
+
+def _synthetic_csv(rows: int) -> str:
+    """A river-like series: slow seasonal swell, daily wiggle, 15 minute readings."""
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    step = timedelta(minutes=15)
+    lines = ["Timestamp (UTC),Height (m)"]
+    for i in range(rows):
+        ts = start + step * i
+        h = 3.2 + 0.4 * math.sin(i / 2000.0) + 0.05 * math.sin(i / 48.0)
+        lines.append(f"{ts.strftime('%Y-%m-%dT%H:%M:%SZ')},{h:.2f}")
+    return "\n".join(lines) + "\n"
+
+
+def _time_stage(fn, repeat: int, setup=None) -> float:
+    """Median of `repeat` runs, in milliseconds. setup, if given, runs untimed before each."""
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(samples)
+
+
+def _clear_caches():
+    render_image._FONT_CACHE.clear()
+    glyph_atlas._ATLASES.clear()
+    render_image._LAYOUT_CACHE.clear()
+    render_image._STATIC_LAYER_CACHE.clear()
+    render_image._TILE_CACHE.clear()
+    river_data._DOWNSAMPLE_MEMO.clear()
+
+
+def _fixture_document() -> dict:
+    """The two configured stations, with fixture CSVs standing in for the EA fetch."""
+    marlow = os.path.join(TEST_DATA_DIR, "Marlow-Lock-height-data.csv")
+    cookham = os.path.join(TEST_DATA_DIR, "Cookham-Lock-height-data.csv")
+    stations = []
+    for station, path in zip(river_config.STATIONS, (marlow, cookham)):
+        stations.append({**station, "url": "file://" + path})
+    return river_data.build_river_level_document(stations, threshold=THRESHOLD)
+
+
+def run(repeat: int, rows_list) -> dict:
+    results = {}
+
+    for path in _fixture_files():
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        points, _, _ = river_data._parse_csv(text)
+        results[f"parse_csv/{name}"] = _time_stage(lambda: river_data._parse_csv(text), repeat)
+        results[f"lttb/{name}"] = _time_stage(lambda: largest_triangle_three_buckets(points, THRESHOLD), repeat)
+
+    for rows in rows_list:
+        text = _synthetic_csv(rows)
+        points, _, _ = river_data._parse_csv(text)
+        # Big series are slow enough that the median of three runs is a stable measurement.
+        big_repeat = min(repeat, 3) if rows >= 100_000 else repeat
+        results[f"parse_csv/synthetic_{rows}"] = _time_stage(lambda: river_data._parse_csv(text), big_repeat)
+        results[f"lttb/synthetic_{rows}"] = _time_stage(
+            lambda: largest_triangle_three_buckets(points, THRESHOLD), big_repeat
+        )
+
+    marlow = river_config.STATIONS[0]
+    with open(os.path.join(TEST_DATA_DIR, "Marlow-Lock-height-data.csv"), "r", encoding="utf-8") as f:
+        marlow_csv = f.read()
+    for prefix, setup in (("station", _clear_caches), ("station_warm", None)):
+        results[f"{prefix}/build_station_document"] = _time_stage(
+            lambda: river_data.build_station_document(marlow, THRESHOLD, csv_text=marlow_csv), repeat, setup
+        )
+
+    doc = _fixture_document()
+    renders = [
+        ("_render_latest_image", render_image._render_latest_image),
+        ("render_latest_png", render_image.render_latest_png),
+        ("render_latest_mono_hlsb_black", render_image.render_latest_mono_hlsb_black),
+        ("render_latest_3color_png", render_image.render_latest_3color_png),
+        ("render_latest_3color_bin", render_image.render_latest_3color_bin),
+    ]
+    for prefix, setup in (("render", _clear_caches), ("render_warm", None)):
+        for name, fn in renders:
+            results[f"{prefix}/{name}"] = _time_stage(lambda: fn(doc), repeat, setup)
+    results["json/dumps"] = _time_stage(
+        lambda: json.dumps(doc, separators=(",", ":")).encode("utf-8"), repeat
+    )
+
+    return results
+
+
+def compare(results: dict, baselines: dict, tolerance: float, min_ms: float) -> list:
+    """Stages slower than baseline * (1 + tolerance). Stages quicker than min_ms are compared
+    against min_ms instead: a few milliseconds of scheduler or GC noise is a big fraction of them."""
+    regressions = []
+    for stage, ms in sorted(results.items()):
+        base = baselines.get(stage)
+        if base is None:
+            continue
+        limit = max(base, min_ms) * (1.0 + tolerance)
+        if ms > limit:
+            regressions.append((stage, base, ms))
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument(
+        "--rows",
+        default="10000,100000,1000000",
+        help="Comma-separated synthetic series sizes (default: 10000,100000,1000000)",
+    )
+    parser.add_argument("--baselines", default=DEFAULT_BASELINES)
+    parser.add_argument("--update-baselines", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown, 0.5 = 50%% (default)")
+    parser.add_argument("--min-ms", type=float, default=10.0, help="Floor for the baseline of quick stages (default: 10)")
+    args = parser.parse_args()
+
+    rows_list = [int(r) for r in args.rows.split(",") if r.strip()]
+    results = run(args.repeat, rows_list)
+
+    baselines = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines, "r", encoding="utf-8") as f:
+            baselines = json.load(f)
+
+    width = max(len(k) for k in results)
+    print(f"{'stage':<{width}}  {'ms':>10}  {'baseline':>10}")
+    for stage, ms in sorted(results.items()):
+        base = baselines.get(stage)
+        base_s = f"{base:10.2f}" if base is not None else f"{'-':>10}"
+        print(f"{stage:<{width}}  {ms:10.2f}  {base_s}")
+
+    if args.update_baselines:
+        # Replace every baseline, so they all come from the same run on the same machine.
+        baselines = {k: round(v, 3) for k, v in results.items()}
+        with open(args.baselines, "w", encoding="utf-8") as f:
+            json.dump(dict(sorted(baselines.items())), f, indent=2)
+            f.write("\n")
+        print(f"Wrote {args.baselines}")
+        return 0
+
+    regressions = compare(results, baselines, args.tolerance, args.min_ms)
+    for stage, base, ms in regressions:
+        print(f"REGRESSION {stage}: {ms:.2f}ms vs baseline {base:.2f}ms")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
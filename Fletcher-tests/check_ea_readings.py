@@ -0,0 +1,160 @@
+"""Check the ea_readings incremental source against a local stand-in for the EA services.
+
+Serves an ExampleData CSV from a local HTTP server as both the station CSV (the last five
+days up to the simulated "now") and an EA-style readings endpoint that honours ?since=.
+The simulated clock then steps forward one reading at a time. At every step, the station
+document built through ea_readings must match one built from the full CSV. The script also
+checks the fallbacks (the API failing, and readings that skip ahead leaving a gap) and
+reports how many bytes each path transferred.
+
+    python Fletcher-tests/check_ea_readings.py
+    python Fletcher-tests/check_ea_readings.py path/to/station.csv
+
+Exits 1 on any mismatch.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(HERE)
+LAMBDA_DIR = os.path.join(REPO_ROOT, "Fletcher", "lambda")
+DEFAULT_CSV = os.path.join(REPO_ROOT, "Fletcher", "ExampleData", "Marlow-Lock-height-data_FallingRising.csv")
+
+sys.path.insert(0, LAMBDA_DIR)
+
+import ea_readings  # noqa: E402
+import river_data  # noqa: E402
+
+THRESHOLD = 200
+# Readings the stand-in CSV holds at any moment (the real ones cover about five days).
+WINDOW = 400
+
+
+class StandIn:
+    """The readings published up to `now`, and what the server has sent."""
+
+    def __init__(self, header: str, rows):
+        self.header = header
+        self.rows = rows
+        self.now = WINDOW
+        self.fail_api = False
+        self.hide_from = None
+        self.bytes = {"csv": 0, "readings": 0}
+        self.requests = {"csv": 0, "readings": 0}
+
+    def csv(self) -> bytes:
+        lines = [self.header] + self.rows[max(0, self.now - WINDOW):self.now]
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    def readings(self, since: str) -> bytes:
+        since_ts = datetime.strptime(since, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+        items = []
+        for i, row in enumerate(self.rows[:self.now]):
+            if self.hide_from is not None and self.hide_from <= i < self.now - 1:
+                continue  # The API lost these: only the newest reading comes back.
+            ts_text, height = row.split(",")[:2]
+            ts = datetime.strptime(ts_text, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+            if ts >= since_ts:
+                items.append({"dateTime": ts_text, "value": float(height), "measure": "stand-in"})
+        return json.dumps({"meta": {}, "items": list(reversed(items))}).encode("utf-8")
+
+
+def _handler_for(stand_in: StandIn):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/station.csv":
+                kind, body = "csv", stand_in.csv()
+            elif url.path == "/readings" and not stand_in.fail_api:
+                kind, body = "readings", stand_in.readings(parse_qs(url.query)["since"][0])
+            else:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            stand_in.bytes[kind] += len(body)
+            stand_in.requests[kind] += 1
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("csv", nargs="?", default=DEFAULT_CSV)
+    args = parser.parse_args()
+
+    with open(args.csv, "r", encoding="utf-8") as f:
+        lines = [line for line in f.read().splitlines() if line.strip()]
+    stand_in = StandIn(lines[0], lines[1:])
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _handler_for(stand_in))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    csv_station = {"name": "stand-in", "url": f"{base}/station.csv", "top_of_normal_range_m": 3.23}
+    api_station = {**csv_station, "source": ea_readings.SOURCE, "readings_url": f"{base}/readings"}
+
+    ea_readings.reset()
+    failures = 0
+    steps = 0
+    fallbacks = 0
+
+    def check(label: str):
+        nonlocal failures
+        expected = river_data.build_station_document(csv_station, THRESHOLD)
+        before = stand_in.requests["csv"]
+        got = river_data.build_station_document(api_station, THRESHOLD)
+        if got != expected:
+            failures += 1
+            print(f"MISMATCH at {label}: {stand_in.rows[stand_in.now - 1]}")
+        # Any CSV fetch after the reference's means ea_readings fell back to it.
+        return stand_in.requests["csv"] > before
+
+    check("seed")
+    csv_bytes_before = stand_in.bytes["csv"]
+    readings_bytes_before = stand_in.bytes["readings"]
+    while stand_in.now < len(stand_in.rows) - 20:
+        stand_in.now += 1
+        steps += 1
+        fallbacks += check(f"step {steps}")
+    csv_bytes = stand_in.bytes["csv"] - csv_bytes_before
+    readings_bytes = stand_in.bytes["readings"] - readings_bytes_before
+
+    stand_in.fail_api = True
+    stand_in.now += 1
+    api_failure_fell_back = check("API failure")
+    stand_in.fail_api = False
+
+    stand_in.hide_from = stand_in.now
+    stand_in.now += 5
+    gap_fell_back = check("gap")
+    stand_in.hide_from = None
+
+    stand_in.now += 1
+    recovered_incremental = not check("after gap")
+    server.shutdown()
+
+    # The reference side fetched the CSV once per step too; per step, the API path needed only its readings page.
+    print(f"{steps} incremental steps, {failures} mismatches, {fallbacks} unexpected fallbacks")
+    print(f"bytes per step: full CSV {csv_bytes // max(steps, 1)}, since= readings {readings_bytes // max(steps, 1)}")
+    print(f"API failure -> full CSV: {api_failure_fell_back}; gap -> full CSV: {gap_fell_back}; incremental again after: {recovered_incremental}")
+    ok = failures == 0 and fallbacks == 0 and api_failure_fell_back and gap_fell_back and recovered_incremental
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
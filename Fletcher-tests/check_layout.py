@@ -0,0 +1,138 @@
+"""Render 1 to 4 stations and check nothing on the frame lands on anything else.
+
+Builds station documents offline from the ExampleData CSVs, renders each station count
+through render_image, and records where every piece of text was drawn. Then it checks:
+
+  * no two pieces of text overlap (clock, station names, heights, axis and reference labels);
+  * nothing else reaches up into the clock's line, CLOCK_Y to CLOCK_Y + CLOCK_FONT_SIZE;
+  * no text is drawn inside a graph;
+  * graphs don't overlap each other, and everything stays on the frame.
+
+    python Fletcher-tests/check_layout.py
+    python Fletcher-tests/check_layout.py --size 800x480 --save /tmp/layouts
+
+Exits 1 if any check fails.
+"""
+
+import argparse
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(HERE)
+LAMBDA_DIR = os.path.join(REPO_ROOT, "Fletcher", "lambda")
+EXAMPLE_DATA_DIR = os.path.join(REPO_ROOT, "Fletcher", "ExampleData")
+
+sys.path.insert(0, LAMBDA_DIR)
+
+import render_image  # noqa: E402
+import river_config  # noqa: E402
+import river_data  # noqa: E402
+
+THRESHOLD = 200
+UTC_TIME = "2026-01-22T16:00:00+00:00"
+
+# river_config station -> the ExampleData CSV standing in for its live one.
+SAMPLES = {
+    "Marlow Downstream": "Marlow-Lock-height-data_FallingRising.csv",
+    "Cookham Upstream": "Cookham-Lock-height-data_InterestingWiggles.csv",
+}
+
+
+def _station_docs():
+    docs = []
+    for station in river_config.STATIONS:
+        with open(os.path.join(EXAMPLE_DATA_DIR, SAMPLES[station["name"]]), "r", encoding="utf-8") as f:
+            docs.append(river_data.build_station_document(station, THRESHOLD, csv_text=f.read()))
+    return docs
+
+
+def _overlap(a, b) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def render(stations, size):
+    """Render stations at size, returning (image, [(text, bbox)] for every piece of text drawn)."""
+    drawn = []
+    draw_text = render_image._draw_text
+
+    def recording_draw_text(draw, xy, text, fill, font):
+        drawn.append((text, tuple(int(v) for v in draw.textbbox(xy, text, font=font))))
+        return draw_text(draw, xy, text, fill, font)
+
+    # Cached layers and tiles would skip the draws this is here to see.
+    render_image._STATIC_LAYER_CACHE.clear()
+    render_image._TILE_CACHE.clear()
+    render_image._draw_text = recording_draw_text
+    try:
+        img = render_image._render_latest_image({"utc_time": UTC_TIME, "stations": stations}, size)
+    finally:
+        render_image._draw_text = draw_text
+    return img, drawn
+
+
+def check(stations, size):
+    width, height = size
+    img, drawn = render(stations, size)
+    layout = render_image.compute_layout(width, height, len(stations))
+    time_label, updated_date_label = render_image._header_labels({"utc_time": UTC_TIME})
+    header = [bbox for text, bbox in drawn if text in (time_label, updated_date_label)]
+    clock_line = (
+        min(bbox[0] for bbox in header),
+        0,
+        width,
+        render_image.CLOCK_Y + layout["clock_font_size"],
+    )
+    graphs = []
+    for box in layout["stations"]:
+        top_y = box["y0"] + render_image.TITLE_H
+        graphs.append((box["x0"], top_y, box["x0"] + box["graph_width"], top_y + box["graph_height"]))
+
+    problems = []
+    for i, (text, bbox) in enumerate(drawn):
+        if bbox[0] < 0 or bbox[1] < 0 or bbox[2] > width or bbox[3] > height:
+            problems.append(f"{text!r} {bbox} runs off the frame")
+        for other, other_bbox in drawn[i + 1:]:
+            if _overlap(bbox, other_bbox):
+                problems.append(f"{text!r} {bbox} overlaps {other!r} {other_bbox}")
+        if text not in (time_label, updated_date_label) and _overlap(bbox, clock_line):
+            problems.append(f"{text!r} {bbox} reaches into the clock's line {clock_line}")
+        for n, graph in enumerate(graphs):
+            if _overlap(bbox, graph):
+                problems.append(f"{text!r} {bbox} is inside graph {n + 1} {graph}")
+    for n, graph in enumerate(graphs):
+        # A block is its title, the graph and the time labels under it.
+        block = (graph[0], graph[1] - render_image.TITLE_H, graph[2], graph[3] + render_image.LABEL_H)
+        if block[3] > height:
+            problems.append(f"graph {n + 1} {block} runs off the bottom of the frame")
+        for m, other in enumerate(graphs[n + 1:], start=n + 2):
+            if _overlap(block, other):
+                problems.append(f"graph {n + 1} {block} overlaps graph {m} {other}")
+    return img, problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", default="400x300", help="Display size as WIDTHxHEIGHT (default: 400x300)")
+    parser.add_argument("--stations", type=int, default=4, help="Check every station count up to this (default: 4)")
+    parser.add_argument("--save", metavar="DIR", help="Also write each render to DIR as layout_<count>.png")
+    args = parser.parse_args()
+    size = tuple(int(v) for v in args.size.lower().split("x"))
+
+    samples = _station_docs()
+    failures = 0
+    for count in range(1, args.stations + 1):
+        stations = [samples[i % len(samples)] for i in range(count)]
+        img, problems = check(stations, size)
+        print(f"{count} station{'s' if count > 1 else ''} at {size[0]}x{size[1]}: {'FAIL' if problems else 'ok'}")
+        for problem in problems:
+            print(f"  {problem}")
+        failures += len(problems)
+        if args.save:
+            os.makedirs(args.save, exist_ok=True)
+            img.save(os.path.join(args.save, f"layout_{count}.png"))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
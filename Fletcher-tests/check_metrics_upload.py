@@ -0,0 +1,90 @@
+"""Check that the public metrics-upload function URL can't start a render.
+
+Sends function-URL events (as the Lambda receives them) straight to app.handler, with an
+in-memory S3 client and the render pipeline replaced by one that fails the check if it
+is ever reached:
+
+    python Fletcher-tests/check_metrics_upload.py
+
+Exits 1 if any non-POST request gets anything but a 405, or any request without the token
+writes to S3.
+"""
+
+import json
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(HERE)
+LAMBDA_DIR = os.path.join(REPO_ROOT, "Fletcher", "lambda")
+
+sys.path.insert(0, LAMBDA_DIR)
+os.environ.setdefault("BUCKET_NAME", "check-bucket")
+os.environ["METRICS_UPLOAD_TOKEN"] = "check-token"
+
+import app  # noqa: E402
+import river_data  # noqa: E402
+
+
+class RecordingS3:
+    def __init__(self):
+        self.puts = []
+
+    def put_object(self, **kwargs):
+        self.puts.append(kwargs["Key"])
+
+
+def _url_event(method: str, token: str = None, body: dict = None) -> dict:
+    headers = {"content-type": "application/json"}
+    if token is not None:
+        headers["x-pinky-token"] = token
+    return {
+        "version": "2.0",
+        "rawPath": "/",
+        "headers": headers,
+        "requestContext": {"http": {"method": method, "path": "/"}},
+        "body": json.dumps(body) if body is not None else None,
+        "isBase64Encoded": False,
+    }
+
+
+def main() -> int:
+    renders = []
+
+    def no_render(*args, **kwargs):
+        renders.append(args)
+        raise AssertionError("function URL request reached the render path")
+
+    river_data.build_river_level_document = no_render
+    s3 = app._s3 = RecordingS3()
+
+    summary = {"device_id": "check-pico", "cycles": 1}
+    cases = [
+        ("GET", _url_event("GET"), 405, 0),
+        ("HEAD", _url_event("HEAD"), 405, 0),
+        ("PUT with token", _url_event("PUT", "check-token", summary), 405, 0),
+        ("GET with token", _url_event("GET", "check-token"), 405, 0),
+        ("POST without token", _url_event("POST", None, summary), 403, 0),
+        ("POST with token", _url_event("POST", "check-token", summary), 200, 1),
+    ]
+
+    failures = 0
+    for label, event, want_status, want_puts in cases:
+        before = len(s3.puts)
+        try:
+            status = app.handler(event, None)["statusCode"]
+        except AssertionError as e:
+            status = str(e)
+        puts = len(s3.puts) - before
+        ok = status == want_status and puts == want_puts
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {label}: {status}, {puts} put_object (want {want_status}, {want_puts})")
+
+    if renders:
+        failures += 1
+        print(f"FAIL render path reached {len(renders)} time(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
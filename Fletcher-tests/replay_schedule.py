@@ -0,0 +1,196 @@
+"""Replay river CSVs through refresh_schedule, offline.
+
+Walks through each CSV as if Fletcher had been running while it was recorded: at each
+simulated run, the station document is built from the readings published so far, and the
+next run is placed wherever refresh_schedule.next_refresh says. Prints the intervals it
+chose and how many runs that took compared with the fixed 15-minute schedule, and checks
+the behaviour the rules promise:
+
+  * every run with the river above top_of_normal_range_m waits at most ELEVATED_MAX_S;
+  * the flat InterestingWiggles sample needs fewer runs than the fixed schedule;
+  * intervals shrink while FallingRising rises to its peak, and while a synthetic river
+    rises quickly from well below its normal range towards it.
+
+    python Fletcher-tests/replay_schedule.py                       # the samples above
+    python Fletcher-tests/replay_schedule.py path/to/station.csv --top-of-normal 3.23 --highest 4.73 -v
+
+Exits 1 if any check fails.
+"""
+
+import argparse
+import math
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(HERE)
+LAMBDA_DIR = os.path.join(REPO_ROOT, "Fletcher", "lambda")
+EXAMPLE_DATA_DIR = os.path.join(REPO_ROOT, "Fletcher", "ExampleData")
+
+sys.path.insert(0, LAMBDA_DIR)
+
+import refresh_schedule  # noqa: E402
+import river_config  # noqa: E402
+import river_data  # noqa: E402
+
+THRESHOLD = 200
+FIXED_INTERVAL_S = 15 * 60
+
+# (file, river_config station its thresholds come from, checks beyond the elevated cap)
+SAMPLES = [
+    ("Marlow-Lock-height-data_FallingRising.csv", "Marlow Downstream", ["shrinks_while_rising"]),
+    ("Cookham-Lock-height-data_InterestingWiggles.csv", "Cookham Upstream", ["fewer_runs"]),
+]
+
+SYNTHETIC_STATION = {
+    "name": "synthetic rise",
+    "url": "synthetic",
+    "top_of_normal_range_m": 1.5,
+    "highest_ever_recorded_m": 2.5,
+}
+
+
+def _synthetic_rise_csv() -> str:
+    """A day and a half flat at 1m, then a steady 5cm/h rise to 1.7m, 15 minute readings."""
+    start = datetime(2026, 2, 1, tzinfo=timezone.utc)
+    lines = ["Timestamp (UTC),Height (m)"]
+    for i in range(36 * 4 + 14 * 4 + 1):
+        rise_h = max(0, i - 36 * 4) / 4.0
+        height = 1.0 + 0.05 * rise_h + 0.01 * math.sin(i / 3.0)
+        lines.append(f"{(start + timedelta(minutes=15 * i)).strftime('%Y-%m-%dT%H:%M:%SZ')},{height:.2f}")
+    return "\n".join(lines) + "\n"
+
+
+def replay(csv_text: str, station: dict, verbose: bool = False) -> dict:
+    lines = csv_text.splitlines()
+    header, rows = lines[0], [line for line in lines[1:] if line.strip()]
+    readings = river_data._readings_after("\n".join([header] + rows))
+
+    # Start once there's a full WINDOW_S of readings to judge the trend by. Until there are
+    # more than THRESHOLD of them, downsample to one fewer point than there are readings.
+    start = readings[0][0] + timedelta(seconds=refresh_schedule.WINDOW_S)
+    index = next(i for i, r in enumerate(readings) if r[0] >= start) + 1
+    now = readings[index - 1][0]
+    end = readings[-1][0]
+    runs = []
+    while now <= end:
+        while index < len(readings) and readings[index][0] <= now:
+            index += 1
+        run_csv = "\n".join([header] + rows[:index]) + "\n"
+        doc = river_data.assemble_document(
+            [river_data.build_station_document(station, min(THRESHOLD, index - 1), csv_text=run_csv)],
+            now,
+            FIXED_INTERVAL_S,
+        )
+        plan = refresh_schedule.next_refresh(doc)
+        detail = plan["stations"].get(station["name"]) or {}
+        runs.append((now, plan["interval_s"], plan["reason"], detail))
+        if verbose:
+            print(
+                f"  {now:%d %b %H:%M}  {detail.get('height_m', float('nan')):6.2f}m"
+                f"  rate {detail.get('rate_m_per_h', 0):+.3f} m/h"
+                f"  vol {detail.get('volatility_m_per_h', 0):.3f} m/h"
+                f"  next in {plan['interval_s'] // 60:3d} min  ({plan['reason']})"
+            )
+        now += timedelta(seconds=plan["interval_s"])
+
+    span_s = (end - runs[0][0]).total_seconds()
+    intervals = [r[1] for r in runs]
+    reasons = {}
+    for r in runs:
+        reasons[r[2]] = reasons.get(r[2], 0) + 1
+    return {
+        "runs": len(runs),
+        "fixed_runs": int(span_s // FIXED_INTERVAL_S) + 1,
+        "min_interval_s": min(intervals),
+        "max_interval_s": max(intervals),
+        "reasons": reasons,
+        "run_list": runs,
+        "peak_ts": max(readings, key=lambda r: r[1])[0],
+    }
+
+
+def _check_elevated_cap(result: dict, station: dict) -> str:
+    top = station.get("top_of_normal_range_m")
+    if not isinstance(top, (int, float)):
+        return None
+    for when, interval_s, _reason, detail in result["run_list"]:
+        if detail.get("height_m", -math.inf) >= top and interval_s > refresh_schedule.ELEVATED_MAX_S:
+            return f"{when:%d %b %H:%M}: {interval_s // 60} min above the normal range"
+    return None
+
+
+def _check_fewer_runs(result: dict, station: dict) -> str:
+    if result["runs"] >= result["fixed_runs"]:
+        return f"{result['runs']} runs, not fewer than the fixed schedule's {result['fixed_runs']}"
+    return None
+
+
+def _check_shrinks_while_rising(result: dict, station: dict) -> str:
+    # The runs from the start of the replay up to the highest reading.
+    rising = [r for r in result["run_list"] if r[0] <= result["peak_ts"]]
+    if len(rising) < 2:
+        return "no rising section replayed"
+    first, last = rising[0][1], rising[-1][1]
+    if last >= first:
+        return f"interval went from {first // 60} to {last // 60} min while rising"
+    for when, interval_s, _reason, _detail in rising:
+        if interval_s > first:
+            return f"{when:%d %b %H:%M}: {interval_s // 60} min, longer than the {first // 60} min at the start of the rise"
+    return None
+
+
+CHECKS = {
+    "elevated_cap": _check_elevated_cap,
+    "fewer_runs": _check_fewer_runs,
+    "shrinks_while_rising": _check_shrinks_while_rising,
+}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("csv", nargs="*", help="CSV files to replay (default: the ExampleData samples)")
+    parser.add_argument("--top-of-normal", type=float, help="top_of_normal_range_m for CSVs given on the command line")
+    parser.add_argument("--highest", type=float, help="highest_ever_recorded_m for CSVs given on the command line")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print every simulated run")
+    args = parser.parse_args()
+
+    by_name = {s["name"]: s for s in river_config.STATIONS}
+    if args.csv:
+        jobs = []
+        for path in args.csv:
+            station = {
+                "name": os.path.basename(path),
+                "url": "file://" + os.path.abspath(path),
+                "top_of_normal_range_m": args.top_of_normal,
+                "highest_ever_recorded_m": args.highest,
+            }
+            with open(path, "r", encoding="utf-8") as f:
+                jobs.append((os.path.basename(path), f.read(), station, []))
+    else:
+        jobs = []
+        for filename, name, checks in SAMPLES:
+            with open(os.path.join(EXAMPLE_DATA_DIR, filename), "r", encoding="utf-8") as f:
+                jobs.append((filename, f.read(), by_name[name], checks))
+        jobs.append((SYNTHETIC_STATION["name"], _synthetic_rise_csv(), SYNTHETIC_STATION, ["shrinks_while_rising"]))
+
+    failures = 0
+    for label, csv_text, station, checks in jobs:
+        print(label)
+        result = replay(csv_text, station, verbose=args.verbose)
+        print(
+            f"  {result['runs']} runs (fixed schedule: {result['fixed_runs']}),"
+            f" intervals {result['min_interval_s'] // 60}-{result['max_interval_s'] // 60} min,"
+            f" {', '.join(f'{k}: {v}' for k, v in sorted(result['reasons'].items()))}"
+        )
+        for check in ["elevated_cap"] + checks:
+            problem = CHECKS[check](result, station)
+            if problem is not None:
+                failures += 1
+                print(f"  FAIL {check}: {problem}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,57 +1,194 @@
 import argparse
+import atexit
 import json
 import os
 import sys
 
 
+def _print_timings(stage_timing):
+    breakdown = stage_timing.breakdown()
+    if not breakdown:
+        return
+    width = max(len(name) for name in breakdown)
+    print(f"{'stage':<{width}}  {'count':>5}  {'total ms':>10}  {'max ms':>10}", file=sys.stderr)
+    for name, s in breakdown.items():
+        print(f"{name:<{width}}  {s['count']:>5}  {s['total_ms']:>10.2f}  {s['max_ms']:>10.2f}", file=sys.stderr)
+
+
 def main() -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument("--out-dir", default=".")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Render every river_config.DEVICE_PROFILES entry into <out-dir>/profiles/<id>/",
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=0,
+        help="Fetch stations in shards of this size on local worker processes, as coordinator mode does with Lambda invocations",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print per-stage timings to stderr (work done in worker processes is not included)",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Keep running: re-render every --interval seconds and serve the artifacts over HTTP from memory",
+    )
+    parser.add_argument("--host", default="0.0.0.0", help="Address for --serve to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="Port for --serve to listen on")
+    parser.add_argument("--interval", type=int, default=15 * 60, help="Seconds between --serve refreshes")
+    parser.add_argument(
+        "--loop",
+        action="store_true",
+        help="Keep running, re-rendering into --out-dir at intervals refresh_schedule picks from the river state",
+    )
     args = parser.parse_args()
 
     repo_root = os.path.dirname(os.path.abspath(__file__))
     lambda_dir = os.path.join(repo_root, "lambda")
     sys.path.insert(0, lambda_dir)
 
+    import frame_delta
     import river_config
     import river_data
     import render_image
+    import stage_timing
+
+    if args.timings:
+        stage_timing.enable()
+        atexit.register(_print_timings, stage_timing)
+
+    if args.batch:
+        import batch_render
+
+        results = batch_render.build_batch(river_config.DEVICE_PROFILES, river_config.STATIONS, threshold=200)
+        for profile_id, artifacts in results.items():
+            profile_dir = os.path.join(os.path.abspath(args.out_dir), "profiles", profile_id)
+            os.makedirs(profile_dir, exist_ok=True)
+            for filename, (body, _content_type) in artifacts.items():
+                path = os.path.join(profile_dir, filename)
+                with open(path, "wb") as f:
+                    f.write(body)
+                print(path)
+        return 0
+
+    def build_payload(schedule_interval_s: int = 15 * 60):
+        if args.shard_size:
+            from concurrent.futures import ProcessPoolExecutor
+
+            import sharding
+
+            with ProcessPoolExecutor() as executor:
+                return sharding.build_river_level_document_sharded(
+                    river_config.STATIONS,
+                    sharding.local_invoker(executor),
+                    threshold=200,
+                    schedule_interval_s=schedule_interval_s,
+                    shard_size=args.shard_size,
+                )
+        return river_data.build_river_level_document(
+            river_config.STATIONS, threshold=200, schedule_interval_s=schedule_interval_s
+        )
+
+    if args.serve:
+        import serve
+
+        return serve.serve(
+            lambda: build_payload(args.interval),
+            host=args.host,
+            port=args.port,
+            interval_s=args.interval,
+        )
+
+    def write_outputs(payload):
+        out_dir = os.path.abspath(args.out_dir)
+        os.makedirs(out_dir, exist_ok=True)
+
+        json_path = os.path.join(out_dir, "latest.json")
+        png_path = os.path.join(out_dir, "latest.png")
+        bin_path = os.path.join(out_dir, "latest.bin")
+        png_3c_path = os.path.join(out_dir, "latest_3c.png")
+        bin_3c_path = os.path.join(out_dir, "latest_3c.bin")
+        delta_path = os.path.join(out_dir, "latest.delta")
+        delta_3c_path = os.path.join(out_dir, "latest_3c.delta")
+
+        def read_previous(path):
+            try:
+                with open(path, "rb") as f:
+                    return f.read()
+            except OSError:
+                return None
+
+        prev_bin_bytes = read_previous(bin_path)
+        prev_bin_3c_bytes = read_previous(bin_3c_path)
+
+        with open(json_path, "wb") as f:
+            f.write(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+        png_bytes = render_image.render_latest_png(payload)
+        with open(png_path, "wb") as f:
+            f.write(png_bytes)
 
-    payload = river_data.build_river_level_document(river_config.STATIONS, threshold=200)
+        bin_bytes = render_image.render_latest_mono_hlsb_black(payload)
+        with open(bin_path, "wb") as f:
+            f.write(bin_bytes)
 
-    out_dir = os.path.abspath(args.out_dir)
-    os.makedirs(out_dir, exist_ok=True)
+        png_3c_bytes = render_image.render_latest_3color_png(payload)
+        with open(png_3c_path, "wb") as f:
+            f.write(png_3c_bytes)
 
-    json_path = os.path.join(out_dir, "latest.json")
-    png_path = os.path.join(out_dir, "latest.png")
-    bin_path = os.path.join(out_dir, "latest.bin")
-    png_3c_path = os.path.join(out_dir, "latest_3c.png")
-    bin_3c_path = os.path.join(out_dir, "latest_3c.bin")
+        bin_3c_bytes = render_image.render_latest_3color_bin(payload)
+        with open(bin_3c_path, "wb") as f:
+            f.write(bin_3c_bytes)
 
-    with open(json_path, "wb") as f:
-        f.write(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        delta_paths = []
+        for path, prev_bytes, new_bytes, planes in (
+            (delta_path, prev_bin_bytes, bin_bytes, 1),
+            (delta_3c_path, prev_bin_3c_bytes, bin_3c_bytes, 2),
+        ):
+            delta = frame_delta.encode_delta(prev_bytes, new_bytes, planes) if prev_bytes is not None else None
+            if delta is not None:
+                with open(path, "wb") as f:
+                    f.write(delta)
+                delta_paths.append(path)
 
-    png_bytes = render_image.render_latest_png(payload)
-    with open(png_path, "wb") as f:
-        f.write(png_bytes)
+        print(json_path)
+        print(png_path)
+        print(bin_path)
+        print(png_3c_path)
+        print(bin_3c_path)
+        for path in delta_paths:
+            print(path)
 
-    bin_bytes = render_image.render_latest_mono_hlsb_black(payload)
-    with open(bin_path, "wb") as f:
-        f.write(bin_bytes)
+    if args.loop:
+        import time
+        import traceback
+        from datetime import datetime
 
-    png_3c_bytes = render_image.render_latest_3color_png(payload)
-    with open(png_3c_path, "wb") as f:
-        f.write(png_3c_bytes)
+        import refresh_schedule
 
-    bin_3c_bytes = render_image.render_latest_3color_bin(payload)
-    with open(bin_3c_path, "wb") as f:
-        f.write(bin_3c_bytes)
+        while True:
+            interval_s = refresh_schedule.MIN_INTERVAL_S
+            try:
+                payload = build_payload()
+                plan = refresh_schedule.next_refresh(payload)
+                interval_s = plan["interval_s"]
+                # Publish the next-update time the loop will actually keep to.
+                payload = river_data.assemble_document(
+                    payload["stations"], datetime.fromisoformat(payload["utc_time"]), interval_s
+                )
+                write_outputs(payload)
+                print(f"next refresh in {interval_s // 60} min ({plan['reason']}: {plan['station']})", file=sys.stderr, flush=True)
+            except Exception:
+                traceback.print_exc()
+            time.sleep(interval_s)
 
-    print(json_path)
-    print(png_path)
-    print(bin_path)
-    print(png_3c_path)
-    print(bin_3c_path)
+    write_outputs(build_payload())
     return 0
 
 
@@ -12,6 +12,8 @@ locals {
   pillow_layer_zip_path = "${path.module}/build/pillow-layer.zip"
 }
 
+data "aws_caller_identity" "current" {}
+
 data "archive_file" "lambda_zip" {
   type        = "zip"
   output_path = local.lambda_zip_path
@@ -66,15 +68,24 @@ resource "aws_iam_role_policy" "lambda" {
 
   policy = jsonencode({
     Version = "2012-10-17"
-    Statement = [
+    Statement = concat([
       {
-        Sid    = "WriteObjectsOnly"
+        Sid    = "ReadWriteObjectsOnly"
         Effect = "Allow"
         Action = [
+          "s3:GetObject",
           "s3:PutObject"
         ]
         Resource = local.s3_object_arn_prefix
       },
+      {
+        Sid    = "InvokeSelfForShards"
+        Effect = "Allow"
+        Action = [
+          "lambda:InvokeFunction"
+        ]
+        Resource = "arn:aws:lambda:${var.aws_region}:${data.aws_caller_identity.current.account_id}:function:${var.lambda_function_name}"
+      },
       {
         Sid    = "LambdaLogging"
         Effect = "Allow"
@@ -84,6 +95,63 @@ resource "aws_iam_role_policy" "lambda" {
         ]
         Resource = "${aws_cloudwatch_log_group.lambda.arn}:*"
       }
+      ], [
+      for statement in [
+        {
+          Sid    = "BookNextRun"
+          Effect = "Allow"
+          Action = [
+            "scheduler:CreateSchedule",
+            "scheduler:UpdateSchedule"
+          ]
+          Resource = "arn:aws:scheduler:${var.aws_region}:${data.aws_caller_identity.current.account_id}:schedule/default/${var.lambda_function_name}-next-refresh"
+        },
+        {
+          Sid      = "PassSchedulerRole"
+          Effect   = "Allow"
+          Action   = ["iam:PassRole"]
+          Resource = try(aws_iam_role.scheduler[0].arn, "")
+        }
+      ] : statement if var.adaptive_schedule
+    ])
+  })
+}
+
+# Role EventBridge Scheduler assumes to start the one-shot runs booked by the Lambda.
+resource "aws_iam_role" "scheduler" {
+  count = var.adaptive_schedule ? 1 : 0
+  name  = "${var.lambda_function_name}-scheduler-role"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Action = "sts:AssumeRole"
+        Effect = "Allow"
+        Principal = {
+          Service = "scheduler.amazonaws.com"
+        }
+      }
+    ]
+  })
+
+  tags = var.tags
+}
+
+resource "aws_iam_role_policy" "scheduler" {
+  count = var.adaptive_schedule ? 1 : 0
+  name  = "${var.lambda_function_name}-scheduler-policy"
+  role  = aws_iam_role.scheduler[0].id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Sid      = "InvokeFletcher"
+        Effect   = "Allow"
+        Action   = ["lambda:InvokeFunction"]
+        Resource = aws_lambda_function.fletcher.arn
+      }
     ]
   })
 }
@@ -108,8 +176,17 @@ resource "aws_lambda_function" "fletcher" {
 
   environment {
     variables = {
-      BUCKET_NAME = var.bucket_name
-      KEY_PREFIX  = local.key_prefix_normalized
+      BUCKET_NAME           = var.bucket_name
+      KEY_PREFIX            = local.key_prefix_normalized
+      SCHEDULE_RATE_MINUTES = tostring(var.schedule_rate_minutes)
+      METRICS_UPLOAD_TOKEN  = var.metrics_upload_token
+      SHARD_SIZE            = tostring(var.shard_size)
+      STAGE_TIMING          = var.stage_timing ? "1" : "0"
+      IMPORT_PROFILE        = var.import_profile ? "1" : "0"
+      PNG_COMPRESS_LEVEL    = tostring(var.png_compress_level)
+      PNG_ZLIB_STRATEGY     = var.png_zlib_strategy
+      ADAPTIVE_SCHEDULE     = var.adaptive_schedule ? "1" : "0"
+      SCHEDULER_ROLE_ARN    = var.adaptive_schedule ? aws_iam_role.scheduler[0].arn : ""
     }
   }
 
@@ -122,8 +199,8 @@ resource "aws_lambda_function" "fletcher" {
 
 resource "aws_cloudwatch_event_rule" "every_15_minutes" {
   name                = "${var.lambda_function_name}-schedule"
-  description         = "Trigger Fletcher Lambda every 15 minutes"
-  schedule_expression = "rate(15 minutes)"
+  description         = "Trigger Fletcher Lambda every ${var.schedule_rate_minutes} minutes"
+  schedule_expression = "rate(${var.schedule_rate_minutes} minutes)"
   tags                = var.tags
 }
 
@@ -131,6 +208,7 @@ resource "aws_cloudwatch_event_target" "lambda" {
   rule      = aws_cloudwatch_event_rule.every_15_minutes.name
   target_id = "FletcherLambda"
   arn       = aws_lambda_function.fletcher.arn
+  input     = var.schedule_mode == "single" ? null : jsonencode({ mode = var.schedule_mode })
 }
 
 resource "aws_lambda_permission" "allow_eventbridge" {
@@ -140,3 +218,47 @@ resource "aws_lambda_permission" "allow_eventbridge" {
   principal     = "events.amazonaws.com"
   source_arn    = aws_cloudwatch_event_rule.every_15_minutes.arn
 }
+
+# Optional fast path between scheduled runs: a cheap check every watch_rate_minutes that
+# publishes early when a river starts rising fast (see river_data.watch_stations).
+resource "aws_cloudwatch_event_rule" "watch" {
+  count               = var.watch_rate_minutes > 0 ? 1 : 0
+  name                = "${var.lambda_function_name}-watch"
+  description         = "Check Fletcher stations for rapid rises every ${var.watch_rate_minutes} minutes"
+  schedule_expression = var.watch_rate_minutes == 1 ? "rate(1 minute)" : "rate(${var.watch_rate_minutes} minutes)"
+  tags                = var.tags
+}
+
+resource "aws_cloudwatch_event_target" "watch" {
+  count     = var.watch_rate_minutes > 0 ? 1 : 0
+  rule      = aws_cloudwatch_event_rule.watch[0].name
+  target_id = "FletcherLambdaWatch"
+  arn       = aws_lambda_function.fletcher.arn
+  input     = jsonencode({ mode = "watch" })
+}
+
+resource "aws_lambda_permission" "allow_eventbridge_watch" {
+  count         = var.watch_rate_minutes > 0 ? 1 : 0
+  statement_id  = "AllowExecutionFromEventBridgeWatch"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.fletcher.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.watch[0].arn
+}
+
+# Optional public endpoint for Pinky metrics uploads. Requests are checked against
+# metrics_upload_token in the Lambda itself.
+resource "aws_lambda_function_url" "metrics_upload" {
+  count              = var.metrics_upload_token == "" ? 0 : 1
+  function_name      = aws_lambda_function.fletcher.function_name
+  authorization_type = "NONE"
+}
+
+resource "aws_lambda_permission" "allow_metrics_upload_url" {
+  count                  = var.metrics_upload_token == "" ? 0 : 1
+  statement_id           = "AllowMetricsUploadFunctionUrl"
+  action                 = "lambda:InvokeFunctionUrl"
+  function_name          = aws_lambda_function.fletcher.function_name
+  principal              = "*"
+  function_url_auth_type = "NONE"
+}
@@ -9,3 +9,11 @@ output "lambda_role_arn" {
 output "s3_write_resource" {
   value = local.s3_object_arn_prefix
 }
+
+output "metrics_upload_url" {
+  value = length(aws_lambda_function_url.metrics_upload) > 0 ? aws_lambda_function_url.metrics_upload[0].function_url : ""
+}
+
+output "scheduler_role_arn" {
+  value = length(aws_iam_role.scheduler) > 0 ? aws_iam_role.scheduler[0].arn : ""
+}
@@ -20,6 +20,82 @@ variable "lambda_function_name" {
   default     = "fletcher-walking-skeleton"
 }
 
+variable "schedule_rate_minutes" {
+  type        = number
+  description = "How often EventBridge runs the Lambda. Also passed to the Lambda so it can publish when its output is next expected to change."
+  default     = 15
+}
+
+variable "schedule_mode" {
+  type        = string
+  description = "How the schedule runs the Lambda: \"single\" (walking-skeleton/ outputs), \"batch\" (every DEVICE_PROFILES entry to profiles/<id>/) or \"coordinator\" (fetch stations in shards on parallel invocations of this function)."
+  default     = "single"
+
+  validation {
+    condition     = contains(["single", "batch", "coordinator"], var.schedule_mode)
+    error_message = "schedule_mode must be one of single, batch, coordinator."
+  }
+}
+
+variable "shard_size" {
+  type        = number
+  description = "Stations per worker invocation in coordinator mode."
+  default     = 10
+}
+
+variable "metrics_upload_token" {
+  type        = string
+  description = "Shared token Pinky devices send (X-Pinky-Token) to upload metrics summaries. Leave empty to not create the upload function URL."
+  default     = ""
+  sensitive   = true
+}
+
+variable "adaptive_schedule" {
+  type        = bool
+  description = "After each scheduled run, book the next one with a one-shot EventBridge Scheduler entry, sooner when rivers are rising or high and later when they are flat (see lambda/refresh_schedule.py). The fixed schedule_rate_minutes rule keeps running as a backstop, so raise it (e.g. to 60) when enabling this."
+  default     = false
+}
+
+variable "watch_rate_minutes" {
+  type        = number
+  description = "If > 0, also invoke the Lambda in watch mode every N minutes: it fetches the station CSVs and renders and publishes only when a station rises rapidly or crosses its top of normal range. 0 disables it."
+  default     = 0
+}
+
+variable "stage_timing" {
+  type        = bool
+  description = "Log per-stage timings as CloudWatch Embedded Metric Format lines (Fletcher namespace) and include them in the invoke response."
+  default     = true
+}
+
+variable "import_profile" {
+  type        = bool
+  description = "Log per-module import times on each cold start (and import_<package> stage metrics), for tracking cold-start latency."
+  default     = false
+}
+
+variable "png_compress_level" {
+  type        = number
+  description = "zlib level (0-9) for latest.png and latest_3c.png."
+  default     = 9
+
+  validation {
+    condition     = var.png_compress_level >= 0 && var.png_compress_level <= 9 && floor(var.png_compress_level) == var.png_compress_level
+    error_message = "png_compress_level must be a whole number from 0 to 9."
+  }
+}
+
+variable "png_zlib_strategy" {
+  type        = string
+  description = "zlib strategy for latest.png and latest_3c.png: default, filtered, huffman, rle or fixed."
+  default     = "rle"
+
+  validation {
+    condition     = contains(["default", "filtered", "huffman", "rle", "fixed"], var.png_zlib_strategy)
+    error_message = "png_zlib_strategy must be one of default, filtered, huffman, rle, fixed."
+  }
+}
+
 variable "tags" {
   type        = map(string)
   description = "Tags applied to created resources."
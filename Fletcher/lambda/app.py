@@ -1,67 +1,411 @@
+import time
+
+_INIT_START = time.perf_counter()
+
 import json
 import os
+from datetime import datetime, timezone
+
+import cold_start
 
-import boto3
+# IMPORT_PROFILE=1 measures every import from here on and reports it on the cold invocation.
+_import_profiler = cold_start.ImportProfiler.install() if os.environ.get("IMPORT_PROFILE") == "1" else None
 
+import artifact_manifest
+import device_metrics
+import frame_delta
+import refresh_schedule
 import river_config
 import river_data
-import render_image
+import sharding
+import stage_timing
+
+# boto3 and Pillow (through render_image) are most of a cold start, and neither is needed
+# until the station CSVs have been fetched. Import them alongside the fetch instead of
+# before it; functions below import them locally, which waits for this if it's still going.
+_preloader = cold_start.preload(["boto3", "render_image"])
+
+_init_ms = (time.perf_counter() - _INIT_START) * 1000.0
+_cold = True
+_s3 = None
+
+# Must match Pinky's DOWNLOAD_CHUNK_SIZE for per-chunk checks to be used.
+FRAME_CHUNK_SIZE = 4096
+
+# Per-station RiseDetector state for watch mode, stored under walking-skeleton/.
+WATCH_STATE_FILENAME = "watch_state.json"
+
+
+def _s3_client():
+    """One S3 client per container; creating it costs more than most of the PUTs."""
+    global _s3
+    if _s3 is None:
+        import boto3
+
+        _s3 = boto3.client("s3")
+    return _s3
+
+
+def _frame_metadata(frame_bytes: bytes, next_update_epoch: str) -> dict:
+    import render_image
+
+    return {
+        "frame-crc32": render_image.frame_crc32(frame_bytes),
+        "next-update-epoch": next_update_epoch,
+        "chunk-size": str(FRAME_CHUNK_SIZE),
+        "chunk-crc32": render_image.chunk_crc32s(frame_bytes, FRAME_CHUNK_SIZE),
+    }
+
+
+@stage_timing.timed("s3_get")
+def _get_previous_object(s3, bucket_name: str, key: str):
+    """Return the bytes currently stored at key, or None if there aren't any (first run)."""
+    try:
+        return s3.get_object(Bucket=bucket_name, Key=key)["Body"].read()
+    except Exception:
+        return None
+
+
+@stage_timing.timed("s3_put")
+def _put_object(s3, **kwargs):
+    return s3.put_object(**kwargs)
+
+
+def _publish(s3, bucket_name: str, dir_key: str, filename: str, body: bytes, content_type: str, manifest, metadata=None) -> str:
+    """Write body at dir_key + filename and at its immutable content-addressed key, and list it in manifest.
+
+    Returns the fixed key, which existing readers (and Pinky) still use.
+    """
+    path, digest = artifact_manifest.content_path(filename, body)
+    extra = {"Metadata": metadata} if metadata else {}
+    _put_object(
+        s3,
+        Bucket=bucket_name,
+        Key=f"{dir_key}{path}",
+        Body=body,
+        ContentType=content_type,
+        CacheControl=artifact_manifest.IMMUTABLE_CACHE_CONTROL,
+        **extra,
+    )
+    key = f"{dir_key}{filename}"
+    _put_object(s3, Bucket=bucket_name, Key=key, Body=body, ContentType=content_type, **extra)
+    manifest.add(filename, path, digest, len(body), metadata)
+    return key
+
+
+def _put_manifest(s3, bucket_name: str, dir_key: str, manifest) -> str:
+    """Point readers at the new set; written last, so everything it lists already exists."""
+    key = f"{dir_key}{artifact_manifest.MANIFEST_FILENAME}"
+    _put_object(
+        s3,
+        Bucket=bucket_name,
+        Key=key,
+        Body=manifest.to_bytes(),
+        ContentType="application/json",
+        CacheControl=artifact_manifest.MANIFEST_CACHE_CONTROL,
+    )
+    return key
+
+
+def _put_delta(s3, bucket_name: str, dir_key: str, filename: str, prev_bytes, new_bytes: bytes, planes: int, manifest):
+    """Publish a dirty-rectangle delta from the previous frame to the new one, if worthwhile."""
+    import render_image
+
+    if prev_bytes is None:
+        return None
+    delta = frame_delta.encode_delta(prev_bytes, new_bytes, planes)
+    if delta is None:
+        return None
+    return _publish(
+        s3,
+        bucket_name,
+        dir_key,
+        filename,
+        delta,
+        "application/octet-stream",
+        manifest,
+        metadata={"frame-crc32": render_image.frame_crc32(new_bytes)},
+    )
+
+
+@stage_timing.timed("json_encode")
+def _encode_json(payload: dict) -> bytes:
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def _next_update_epoch(doc: dict) -> str:
+    # Epoch seconds are easy for Pinky to compare against the response Date header.
+    return str(int(datetime.fromisoformat(doc["next_expected_update_utc"]).timestamp()))
+
+
+def _handle_batch(s3, bucket_name: str, key_prefix: str, schedule_interval_s: int):
+    """Render every river_config.DEVICE_PROFILES entry, writing to profiles/<id>/."""
+    import batch_render
+
+    results = batch_render.build_batch(
+        river_config.DEVICE_PROFILES,
+        river_config.STATIONS,
+        threshold=200,
+        schedule_interval_s=schedule_interval_s,
+    )
+
+    wrote = {}
+    for profile_id, artifacts in results.items():
+        doc = json.loads(artifacts["latest.json"][0])
+        next_update_epoch = _next_update_epoch(doc)
+        dir_key = f"{key_prefix}profiles/{profile_id}/"
+        manifest = artifact_manifest.Manifest(utc_time=doc.get("utc_time"), next_update_epoch=int(next_update_epoch))
+        keys = []
+        for filename, (body, content_type) in artifacts.items():
+            metadata = _frame_metadata(body, next_update_epoch) if filename.endswith(".bin") else None
+            keys.append(_publish(s3, bucket_name, dir_key, filename, body, content_type, manifest, metadata))
+        keys.append(_put_manifest(s3, bucket_name, dir_key, manifest))
+        wrote[profile_id] = keys
+
+    return {
+        "statusCode": 200,
+        "body": json.dumps({"bucket": bucket_name, "profiles": wrote}),
+    }
+
+
+def _with_timings(response: dict) -> dict:
+    """Add the stage breakdown to a JSON response body, so a slow run can be diagnosed from the invoke result."""
+    if not isinstance(response, dict) or not isinstance(response.get("body"), str):
+        return response
+    try:
+        body = json.loads(response["body"])
+    except ValueError:
+        return response
+    if not isinstance(body, dict):
+        return response
+    return {**response, "body": json.dumps({**body, "timings_ms": stage_timing.breakdown()})}
+
+
+def _report_import_profile():
+    """Log the slowest imports, and the bigger top-level packages as import_<name> stages."""
+    _import_profiler.uninstall()
+    print(json.dumps({"import_profile": _import_profiler.top()}, separators=(",", ":")), flush=True)
+    top_level = sorted(_import_profiler.top_level().items(), key=lambda kv: kv[1], reverse=True)
+    for name, ms in top_level[:20]:
+        if ms >= 1.0:
+            stage_timing.record_ms(f"import_{name}", ms)
 
 
 def handler(event, context):
+    # Stage timing is on unless STAGE_TIMING=0; it costs a few perf_counter calls per stage.
+    stage_timing.enable(os.environ.get("STAGE_TIMING", "1") != "0")
+    stage_timing.reset()
+
+    global _cold
+    cold, _cold = _cold, False
+    if cold:
+        stage_timing.record_ms("init", _init_ms)
+
+    if device_metrics.is_function_url_request(event):
+        mode = "metrics_upload"
+    else:
+        mode = (event.get("mode") if isinstance(event, dict) else None) or "single"
+
+    with stage_timing.span("handler"):
+        response = _handle(event, context)
+
+    if cold and _import_profiler is not None:
+        _report_import_profile()
+
+    if not stage_timing.is_enabled():
+        return response
+    # Embedded Metric Format: CloudWatch Logs turns this stdout line into Fletcher/<stage>_ms metrics.
+    stage_timing.emit_emf("Fletcher", {"Mode": mode})
+    if mode == "shard":
+        # The coordinator reads the shard response directly; keep it to the station docs.
+        return response
+    return _with_timings(response)
+
+
+def _handle(event, context):
     bucket_name = os.environ["BUCKET_NAME"]
     key_prefix = os.environ.get("KEY_PREFIX", "")
     if key_prefix and not key_prefix.endswith("/"):
         key_prefix = f"{key_prefix}/"
 
-    payload = river_data.build_river_level_document(river_config.STATIONS, threshold=200)
+    if device_metrics.is_function_url_request(event):
+        return device_metrics.handle_metrics_upload(
+            event,
+            _s3_client(),
+            bucket_name,
+            key_prefix,
+            os.environ.get("METRICS_UPLOAD_TOKEN", ""),
+        )
+
+    schedule_interval_s = int(os.environ.get("SCHEDULE_RATE_MINUTES", "15")) * 60
+
+    mode = event.get("mode") if isinstance(event, dict) else None
+
+    if mode == "shard":
+        return sharding.handle_shard(event)
+
+    if mode == "batch":
+        return _handle_batch(_s3_client(), bucket_name, key_prefix, schedule_interval_s)
+
+    if mode == "watch":
+        return _handle_watch(bucket_name, key_prefix, schedule_interval_s)
+
+    if mode == "coordinator":
+        # Fan the stations out to other invocations of this function, for station lists
+        # too long to fetch and downsample within one invocation's timeout.
+        payload = sharding.build_river_level_document_sharded(
+            river_config.STATIONS,
+            sharding.lambda_invoker(context.function_name),
+            threshold=200,
+            schedule_interval_s=schedule_interval_s,
+            shard_size=int(os.environ.get("SHARD_SIZE", "10")),
+        )
+    else:
+        payload = river_data.build_river_level_document(
+            river_config.STATIONS, threshold=200, schedule_interval_s=schedule_interval_s
+        )
+
+    if os.environ.get("ADAPTIVE_SCHEDULE") != "1":
+        return _publish_document(payload, bucket_name, key_prefix)
+
+    # Adaptive schedule: the river's state picks the next run, and the published next-update
+    # time follows that rather than the fixed rate (which stays on as a backstop).
+    plan = refresh_schedule.next_refresh(payload)
+    payload = river_data.assemble_document(
+        payload["stations"], datetime.fromisoformat(payload["utc_time"]), plan["interval_s"]
+    )
+    response = _publish_document(payload, bucket_name, key_prefix)
+    _schedule_next_run(context, plan, mode)
+    next_refresh = {k: plan[k] for k in ("interval_s", "next_run_utc", "station", "reason")}
+    return {**response, "body": json.dumps({"next_refresh": next_refresh, **json.loads(response["body"])})}
+
+
+@stage_timing.timed("schedule_next")
+def _schedule_next_run(context, plan: dict, mode: str):
+    """Create, or move, the one-shot EventBridge Scheduler entry that starts the next run."""
+    import boto3
+
+    scheduler = boto3.client("scheduler")
+    when = datetime.fromisoformat(plan["next_run_utc"]).astimezone(timezone.utc)
+    params = {
+        "Name": f"{context.function_name}-next-refresh",
+        "ScheduleExpression": refresh_schedule.at_expression(when),
+        "ScheduleExpressionTimezone": "UTC",
+        "FlexibleTimeWindow": {"Mode": "OFF"},
+        "Target": {
+            "Arn": context.invoked_function_arn,
+            "RoleArn": os.environ["SCHEDULER_ROLE_ARN"],
+            "Input": json.dumps({"mode": mode} if mode else {}),
+        },
+        "ActionAfterCompletion": "DELETE",
+    }
+    try:
+        scheduler.update_schedule(**params)
+    except scheduler.exceptions.ResourceNotFoundException:
+        scheduler.create_schedule(**params)
+
+
+def _handle_watch(bucket_name: str, key_prefix: str, schedule_interval_s: int):
+    """Fast path between scheduled runs: render and publish only if a station's detector fires.
+
+    Detector state lives next to the artifacts, so it survives cold starts.
+    """
+    s3 = _s3_client()
+    state_key = f"{key_prefix}walking-skeleton/{WATCH_STATE_FILENAME}"
+    previous = _get_previous_object(s3, bucket_name, state_key)
+    try:
+        states = json.loads(previous) if previous else {}
+    except ValueError:
+        states = {}
 
-    json_key = f"{key_prefix}walking-skeleton/latest.json"
-    png_key = f"{key_prefix}walking-skeleton/latest.png"
-    bin_key = f"{key_prefix}walking-skeleton/latest.bin"
-    png_3c_key = f"{key_prefix}walking-skeleton/latest_3c.png"
-    bin_3c_key = f"{key_prefix}walking-skeleton/latest_3c.bin"
+    result = river_data.watch_stations(river_config.STATIONS, states)
+    events = result["events"]
 
-    s3 = boto3.client("s3")
-    s3.put_object(
+    response = None
+    if events:
+        now = datetime.now(timezone.utc)
+        station_docs = [
+            river_data.build_station_document(station, threshold=200, csv_text=result["csv_texts"].get(station.get("name")))
+            for station in river_config.STATIONS
+        ]
+        payload = river_data.assemble_document(station_docs, now, schedule_interval_s)
+        response = _publish_document(payload, bucket_name, key_prefix)
+
+    # Saved after publishing, so a failed publish is retried by the next watch run.
+    _put_object(
+        s3,
         Bucket=bucket_name,
-        Key=json_key,
-        Body=json.dumps(payload, separators=(",", ":")).encode("utf-8"),
+        Key=state_key,
+        Body=_encode_json(result["states"]),
         ContentType="application/json",
     )
 
+    if response is not None:
+        body = json.loads(response["body"])
+        return {**response, "body": json.dumps({"watch": {"events": events, "stations": result["stations"]}, **body})}
+    return {
+        "statusCode": 200,
+        "body": json.dumps({"watch": {"events": {}, "stations": result["stations"]}, "published": False}),
+    }
+
+
+def _publish_document(payload: dict, bucket_name: str, key_prefix: str):
+    """Render the document and write every artifact under walking-skeleton/."""
+    next_update_epoch = _next_update_epoch(payload)
+
+    dir_key = f"{key_prefix}walking-skeleton/"
+    bin_key = f"{dir_key}latest.bin"
+    bin_3c_key = f"{dir_key}latest_3c.bin"
+    manifest = artifact_manifest.Manifest(utc_time=payload.get("utc_time"), next_update_epoch=int(next_update_epoch))
+
+    with stage_timing.span("import_wait"):
+        _preloader.wait()
+    import render_image
+
+    s3 = _s3_client()
+    prev_bin_bytes = _get_previous_object(s3, bucket_name, bin_key)
+    prev_bin_3c_bytes = _get_previous_object(s3, bucket_name, bin_3c_key)
+
+    json_key = _publish(s3, bucket_name, dir_key, "latest.json", _encode_json(payload), "application/json", manifest)
+
     png_bytes = render_image.render_latest_png(payload)
-    s3.put_object(
-        Bucket=bucket_name,
-        Key=png_key,
-        Body=png_bytes,
-        ContentType="image/png",
-    )
+    png_key = _publish(s3, bucket_name, dir_key, "latest.png", png_bytes, "image/png", manifest)
 
     bin_bytes = render_image.render_latest_mono_hlsb_black(payload)
-    s3.put_object(
-        Bucket=bucket_name,
-        Key=bin_key,
-        Body=bin_bytes,
-        ContentType="application/octet-stream",
+    _publish(
+        s3,
+        bucket_name,
+        dir_key,
+        "latest.bin",
+        bin_bytes,
+        "application/octet-stream",
+        manifest,
+        metadata=_frame_metadata(bin_bytes, next_update_epoch),
     )
 
     png_3c_bytes = render_image.render_latest_3color_png(payload)
-    s3.put_object(
-        Bucket=bucket_name,
-        Key=png_3c_key,
-        Body=png_3c_bytes,
-        ContentType="image/png",
-    )
+    png_3c_key = _publish(s3, bucket_name, dir_key, "latest_3c.png", png_3c_bytes, "image/png", manifest)
 
     bin_3c_bytes = render_image.render_latest_3color_bin(payload)
-    s3.put_object(
-        Bucket=bucket_name,
-        Key=bin_3c_key,
-        Body=bin_3c_bytes,
-        ContentType="application/octet-stream",
+    _publish(
+        s3,
+        bucket_name,
+        dir_key,
+        "latest_3c.bin",
+        bin_3c_bytes,
+        "application/octet-stream",
+        manifest,
+        metadata=_frame_metadata(bin_3c_bytes, next_update_epoch),
     )
 
+    # Deltas go after the full frames, so a delta is never newer than the frame it leads to.
+    wrote_delta_key = _put_delta(s3, bucket_name, dir_key, "latest.delta", prev_bin_bytes, bin_bytes, 1, manifest)
+    wrote_delta_3c_key = _put_delta(
+        s3, bucket_name, dir_key, "latest_3c.delta", prev_bin_3c_bytes, bin_3c_bytes, 2, manifest
+    )
+
+    manifest_key = _put_manifest(s3, bucket_name, dir_key, manifest)
+
     return {
         "statusCode": 200,
         "body": json.dumps(
@@ -73,6 +417,11 @@ def handler(event, context):
                     "bin_key": bin_key,
                     "png_3c_key": png_3c_key,
                     "bin_3c_key": bin_3c_key,
+                    "bin_crc32": render_image.frame_crc32(bin_bytes),
+                    "bin_3c_crc32": render_image.frame_crc32(bin_3c_bytes),
+                    "delta_key": wrote_delta_key,
+                    "delta_3c_key": wrote_delta_3c_key,
+                    "manifest_key": manifest_key,
                 },
                 **payload,
             }
@@ -0,0 +1,47 @@
+import hashlib
+import json
+import os
+
+# Content-addressed objects never change once written, so caches may keep them for a year.
+# manifest.json is the one small object readers revalidate to learn what's current.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MANIFEST_CACHE_CONTROL = "no-cache"
+MANIFEST_FILENAME = "manifest.json"
+
+# Hex digits of SHA-256 in object names: 80 bits, plenty to keep a directory collision-free.
+_NAME_DIGEST_CHARS = 20
+
+
+def content_path(filename: str, body: bytes) -> tuple:
+    """(path, sha256 hex) for body's immutable copy, e.g. "objects/latest_3c.<digest prefix>.bin".
+
+    The path is relative to the directory of filename (and of the manifest).
+    """
+    digest = hashlib.sha256(body).hexdigest()
+    stem, ext = os.path.splitext(filename)
+    return f"objects/{stem}.{digest[:_NAME_DIGEST_CHARS]}{ext}", digest
+
+
+class Manifest:
+    """The current content-addressed path of each artifact in one directory.
+
+    {"version": 1, <fields>, "files": {"latest_3c.bin": {"path", "sha256", "size", ...}}}
+    Extra per-file values (e.g. frame-crc32) come from the object metadata, so a reader
+    can decide whether to fetch a frame from the manifest alone.
+    """
+
+    VERSION = 1
+
+    def __init__(self, **fields):
+        self.fields = fields
+        self.files = {}
+
+    def add(self, filename: str, path: str, digest: str, size: int, metadata: dict = None):
+        entry = {"path": path, "sha256": digest, "size": size}
+        for key, value in (metadata or {}).items():
+            entry[key.replace("-", "_")] = value
+        self.files[filename] = entry
+
+    def to_bytes(self) -> bytes:
+        doc = {"version": self.VERSION, **self.fields, "files": self.files}
+        return json.dumps(doc, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,85 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import river_data
+import render_image
+
+
+def _render_key(profile: dict) -> tuple:
+    """Profiles with the same stations, colours and size produce identical artifacts."""
+    return (
+        tuple(profile["stations"]),
+        str(profile.get("colours", "both")),
+        tuple(profile.get("size", (400, 300))),
+    )
+
+
+def unique_stations(profiles, stations) -> list:
+    """The station configs used by any profile, each once, in STATIONS order."""
+    wanted = set()
+    for profile in profiles:
+        wanted.update(profile["stations"])
+    known = {s.get("name") for s in stations}
+    missing = sorted(wanted - known)
+    if missing:
+        raise ValueError(f"Profiles reference unknown station(s): {', '.join(missing)}")
+    return [s for s in stations if s.get("name") in wanted]
+
+
+def render_artifacts(doc: dict, colours: str, size) -> dict:
+    """Render one profile's artifacts. Returns {filename: (bytes, content_type)}.
+
+    Module-level so it can run in a worker process.
+    """
+    size = tuple(size)
+    out = {
+        "latest.json": (json.dumps(doc, separators=(",", ":")).encode("utf-8"), "application/json"),
+    }
+    if colours in ("2", "both"):
+        out["latest.png"] = (render_image.render_latest_png(doc, size), "image/png")
+        out["latest.bin"] = (render_image.render_latest_mono_hlsb_black(doc, size), "application/octet-stream")
+    if colours in ("3", "both"):
+        out["latest_3c.png"] = (render_image.render_latest_3color_png(doc, size), "image/png")
+        out["latest_3c.bin"] = (render_image.render_latest_3color_bin(doc, size), "application/octet-stream")
+    return out
+
+
+def _render_all(jobs, max_workers):
+    """Run render_artifacts for each (doc, colours, size) job, in a process pool if we can.
+
+    AWS Lambda has no /dev/shm, so ProcessPoolExecutor can't start there; fall back to
+    rendering in this process.
+    """
+    if max_workers != 1 and len(jobs) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                futures = [pool.submit(render_artifacts, *job) for job in jobs]
+                return [f.result() for f in futures]
+        except (OSError, NotImplementedError, ImportError):
+            pass
+    return [render_artifacts(*job) for job in jobs]
+
+
+def build_batch(profiles, stations, threshold: int = 200, schedule_interval_s: int = 15 * 60, max_workers=None) -> dict:
+    """Fetch every station any profile needs once, then render every profile.
+
+    Profiles that would render identically share one render.
+    Returns {profile_id: {filename: (bytes, content_type)}}.
+    """
+    full_doc = river_data.build_river_level_document(
+        unique_stations(profiles, stations), threshold=threshold, schedule_interval_s=schedule_interval_s
+    )
+
+    jobs = []
+    job_index = {}
+    profile_jobs = {}
+    for profile in profiles:
+        key = _render_key(profile)
+        if key not in job_index:
+            doc = river_data.select_stations(full_doc, profile["stations"], schedule_interval_s)
+            job_index[key] = len(jobs)
+            jobs.append((doc, key[1], key[2]))
+        profile_jobs[profile["id"]] = job_index[key]
+
+    results = _render_all(jobs, max_workers)
+    return {profile_id: results[i] for profile_id, i in profile_jobs.items()}
@@ -0,0 +1,118 @@
+import importlib
+import sys
+import threading
+import time
+
+
+class Preloader:
+    """Import modules on a background thread, so they load while the handler waits on the network.
+
+    Code that needs one of the modules just imports it as usual: Python's per-module import
+    lock makes that wait for the background import if it is still running. An import that
+    fails here is retried (and raises) at that point, in the handler's own stack.
+    """
+
+    def __init__(self, names):
+        self._names = list(names)
+        self._thread = threading.Thread(target=self._run, name="preload-imports", daemon=True)
+
+    def start(self) -> "Preloader":
+        self._thread.start()
+        return self
+
+    def wait(self, timeout: float = None):
+        self._thread.join(timeout)
+
+    def _run(self):
+        for name in self._names:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                pass
+
+
+def preload(names) -> Preloader:
+    return Preloader(names).start()
+
+
+class _TimedLoader:
+    def __init__(self, loader, name: str, profiler: "ImportProfiler"):
+        self._loader = loader
+        self._name = name
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._enter()
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit(self._name, (time.perf_counter() - start) * 1000.0)
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+
+class ImportProfiler:
+    """Per-module import cost, like `python -X importtime` but readable from inside the process.
+
+    Install it before the imports to be measured. Times are wall milliseconds: `inclusive`
+    counts the module and everything it imported, `self` only its own body.
+    """
+
+    def __init__(self):
+        self._records = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def install(cls) -> "ImportProfiler":
+        profiler = cls()
+        sys.meta_path.insert(0, profiler)
+        return profiler
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, name, self)
+                return spec
+        return None
+
+    def _enter(self):
+        stack = getattr(self._local, "children_ms", None)
+        if stack is None:
+            stack = self._local.children_ms = []
+        stack.append(0.0)
+
+    def _exit(self, name: str, inclusive_ms: float):
+        stack = self._local.children_ms
+        children_ms = stack.pop()
+        if stack:
+            stack[-1] += inclusive_ms
+        with self._lock:
+            self._records[name] = (inclusive_ms, inclusive_ms - children_ms)
+
+    def top(self, n: int = 25) -> list:
+        """The n slowest imports by inclusive time, as [{"module", "inclusive_ms", "self_ms"}]."""
+        with self._lock:
+            items = sorted(self._records.items(), key=lambda kv: kv[1][0], reverse=True)[:n]
+        return [
+            {"module": name, "inclusive_ms": round(inc, 2), "self_ms": round(own, 2)}
+            for name, (inc, own) in items
+        ]
+
+    def top_level(self) -> dict:
+        """Inclusive milliseconds for each top-level package, e.g. {"boto3": 410.2, "PIL": 55.1}."""
+        with self._lock:
+            return {name: round(inc, 2) for name, (inc, _own) in sorted(self._records.items()) if "." not in name}
@@ -0,0 +1,72 @@
+import base64
+import hmac
+import json
+import re
+from datetime import datetime, timezone
+
+MAX_BODY_BYTES = 8 * 1024
+
+_DEVICE_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def is_function_url_request(event) -> bool:
+    """True for any request arriving through the Lambda function URL (EventBridge events have no requestContext).
+
+    The URL is public and only takes metrics uploads, so every such request, whatever its
+    method, goes to handle_metrics_upload and never to the render path.
+    """
+    if not isinstance(event, dict):
+        return False
+    return bool((event.get("requestContext") or {}).get("http"))
+
+
+def _response(status: int, message: str) -> dict:
+    return {
+        "statusCode": status,
+        "headers": {"Content-Type": "application/json"},
+        "body": json.dumps({"message": message}),
+    }
+
+
+def handle_metrics_upload(event: dict, s3, bucket_name: str, key_prefix: str, token: str) -> dict:
+    """Store a Pinky metrics summary under metrics/<device_id>/<utc time>.json.
+
+    Requests must be POSTs carrying the shared token in an X-Pinky-Token header.
+    """
+    method = ((event.get("requestContext") or {}).get("http") or {}).get("method")
+    if method != "POST":
+        return {**_response(405, "method not allowed"), "headers": {"Content-Type": "application/json", "Allow": "POST"}}
+
+    headers = {str(k).lower(): v for k, v in (event.get("headers") or {}).items()}
+    if not token or not hmac.compare_digest(str(headers.get("x-pinky-token", "")), token):
+        return _response(403, "forbidden")
+
+    body = event.get("body") or ""
+    if event.get("isBase64Encoded"):
+        body = base64.b64decode(body)
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    if len(body) > MAX_BODY_BYTES:
+        return _response(413, "too large")
+
+    try:
+        summary = json.loads(body)
+    except ValueError:
+        return _response(400, "invalid json")
+    if not isinstance(summary, dict):
+        return _response(400, "expected an object")
+
+    device_id = str(summary.get("device_id", ""))
+    if not _DEVICE_ID_RE.match(device_id):
+        return _response(400, "invalid device_id")
+
+    now = datetime.now(timezone.utc)
+    summary["received_utc"] = now.isoformat()
+    key = f"{key_prefix}metrics/{device_id}/{now.strftime('%Y%m%dT%H%M%SZ')}.json"
+    s3.put_object(
+        Bucket=bucket_name,
+        Key=key,
+        Body=json.dumps(summary, separators=(",", ":")).encode("utf-8"),
+        ContentType="application/json",
+    )
+    return _response(200, "stored")
@@ -0,0 +1,121 @@
+"""Incremental source for stations on the EA flood-monitoring readings API.
+
+The station CSVs always hold the full multi-day history. The real-time API can be asked
+for just the readings since a given time, so a warm container keeps each station's series
+in memory and only fetches what's new:
+
+    https://environment.data.gov.uk/flood-monitoring/id/measures/<measure>/readings?since=...
+
+A station opts in with "source": "ea_readings" and a "readings_url" (the measure's
+readings endpoint) in river_config.STATIONS; its "url" CSV is still used to load the
+series the first time and whenever the incremental path can't be trusted: the API fails,
+a page comes back full (it may be truncated), or the new readings don't follow on from the
+old ones without a gap.
+"""
+
+import json
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta, timezone
+
+import stage_timing
+
+SOURCE = "ea_readings"
+
+# Bigger than any since= window we expect; a full page means readings may have been cut off.
+PAGE_LIMIT = 2000
+# A hole longer than this many reading intervals between the old and new readings is a gap.
+GAP_INTERVALS = 2
+
+# Station key -> _Series, for the life of the container.
+_SERIES = {}
+
+
+class _Series:
+    """One station's readings, oldest first, trimmed to the span the full CSV covers."""
+
+    __slots__ = ("readings", "span", "interval")
+
+    def __init__(self, readings, span: timedelta, interval: timedelta):
+        self.readings = readings
+        self.span = span
+        self.interval = interval
+
+    @property
+    def last_ts(self) -> datetime:
+        return self.readings[-1][0]
+
+    def extend(self, new_readings):
+        self.readings.extend(new_readings)
+        cutoff = self.last_ts - self.span
+        start = 0
+        while start < len(self.readings) and self.readings[start][0] < cutoff:
+            start += 1
+        if start:
+            del self.readings[:start]
+
+
+def _to_iso_z(ts: datetime) -> str:
+    return ts.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+@stage_timing.timed("fetch_readings")
+def _fetch_readings_since(readings_url: str, since: datetime, timeout_seconds: int = 15) -> list:
+    """[(timestamp, height)] after since from a readings endpoint, oldest first."""
+    query = urllib.parse.urlencode({"since": _to_iso_z(since), "_limit": PAGE_LIMIT})
+    separator = "&" if "?" in readings_url else "?"
+    with urllib.request.urlopen(f"{readings_url}{separator}{query}", timeout=timeout_seconds) as response:
+        doc = json.loads(response.read().decode("utf-8"))
+
+    items = doc["items"]
+    if len(items) >= PAGE_LIMIT:
+        raise ValueError("Readings page full; may be truncated")
+
+    readings = {}
+    for item in items:
+        ts = datetime.fromisoformat(str(item["dateTime"]).replace("Z", "+00:00"))
+        if ts > since:
+            readings[ts] = float(item["value"])
+    return sorted(readings.items())
+
+
+def _points(series: _Series):
+    # The same shape river_data._parse_csv returns: (row_number, height) for LTTB, and the span.
+    points = [(i, height) for i, (_ts, height) in enumerate(series.readings, start=1)]
+    return points, series.readings[0][0], series.last_ts
+
+
+def station_points(station: dict, load_full):
+    """(points, first_ts, last_ts) for station, fetching only readings newer than the last seen.
+
+    load_full(station) returns [(timestamp, height)] from the full CSV; it seeds the series
+    and replaces it whenever the incremental fetch fails or leaves a gap.
+    """
+    key = station.get("readings_url") or station.get("url")
+    series = _SERIES.get(key)
+
+    if series is not None:
+        try:
+            new_readings = _fetch_readings_since(station["readings_url"], series.last_ts)
+        except Exception:
+            new_readings = None
+        if new_readings is not None and (
+            not new_readings or new_readings[0][0] - series.last_ts <= series.interval * GAP_INTERVALS
+        ):
+            series.extend(new_readings)
+            return _points(series)
+        # Couldn't fetch, or the readings don't join up: start again from the full history.
+        _SERIES.pop(key, None)
+
+    readings = load_full(station)
+    if len(readings) < 2:
+        raise ValueError("CSV contained no data rows")
+    span = readings[-1][0] - readings[0][0]
+    interval = span / (len(readings) - 1)
+    series = _SERIES[key] = _Series(list(readings), span, interval)
+    return _points(series)
+
+
+def reset():
+    """Forget every station's series (the next call for each loads the full CSV)."""
+    _SERIES.clear()
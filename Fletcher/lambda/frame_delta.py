@@ -0,0 +1,90 @@
+import struct
+import zlib
+
+# Delta format (all integers big-endian), applied by Pinky on top of the frame it is showing:
+#   header: magic b"FDL1", base_crc32 (u32), new_crc32 (u32), planes (u8), rect_count (u16)
+#   per rect: x_byte (u16), y (u16), width_bytes (u16), height (u16),
+#             then `planes` blocks of width_bytes * height bytes (black plane first, then red).
+# Rect x/width are in bytes (8 pixels) because MONO_HLSB rows pack 8 pixels per byte.
+MAGIC = b"FDL1"
+HEADER = struct.Struct(">4sIIBH")
+RECT = struct.Struct(">HHHH")
+
+WIDTH_BYTES = 400 // 8
+HEIGHT = 300
+
+
+def _crc32(data: bytes) -> int:
+    return zlib.crc32(data) & 0xFFFFFFFF
+
+
+def dirty_rects(prev: bytes, new: bytes, planes: int, width_bytes: int = WIDTH_BYTES, height: int = HEIGHT, merge_gap_rows: int = 8):
+    """Find the rectangles (x_byte, y, width_bytes, height) that differ between two frames.
+
+    Consecutive changed rows are grouped into bands, each with the bounding byte-columns of
+    its changes. Bands separated by merge_gap_rows or fewer unchanged rows are merged, since
+    a few extra rows cost less than another window set-up on the panel.
+    """
+    plane_size = width_bytes * height
+    rects = []
+    band = None  # [first_row, last_row, x_lo, x_hi]
+
+    for y in range(height):
+        lo = None
+        hi = None
+        for p in range(planes):
+            off = p * plane_size + y * width_bytes
+            a = prev[off:off + width_bytes]
+            b = new[off:off + width_bytes]
+            if a == b:
+                continue
+            for x in range(width_bytes):
+                if a[x] != b[x]:
+                    lo = x if lo is None else min(lo, x)
+                    break
+            for x in range(width_bytes - 1, -1, -1):
+                if a[x] != b[x]:
+                    hi = x if hi is None else max(hi, x)
+                    break
+
+        if lo is None:
+            if band is not None and y - band[1] > merge_gap_rows:
+                rects.append((band[2], band[0], band[3] - band[2] + 1, band[1] - band[0] + 1))
+                band = None
+            continue
+
+        if band is None:
+            band = [y, y, lo, hi]
+        else:
+            band[1] = y
+            band[2] = min(band[2], lo)
+            band[3] = max(band[3], hi)
+
+    if band is not None:
+        rects.append((band[2], band[0], band[3] - band[2] + 1, band[1] - band[0] + 1))
+
+    return rects
+
+
+def encode_delta(prev: bytes, new: bytes, planes: int, width_bytes: int = WIDTH_BYTES, height: int = HEIGHT):
+    """Encode the changes from prev to new as a delta, or return None if there is no
+    useful delta (frames differ in size, are identical, or the delta isn't smaller)."""
+    plane_size = width_bytes * height
+    if len(prev) != plane_size * planes or len(new) != plane_size * planes:
+        return None
+
+    rects = dirty_rects(prev, new, planes, width_bytes=width_bytes, height=height)
+    if not rects:
+        return None
+
+    out = bytearray(HEADER.pack(MAGIC, _crc32(prev), _crc32(new), planes, len(rects)))
+    for x_byte, y, w, h in rects:
+        out += RECT.pack(x_byte, y, w, h)
+        for p in range(planes):
+            for row in range(y, y + h):
+                off = p * plane_size + row * width_bytes + x_byte
+                out += new[off:off + w]
+
+    if len(out) >= len(new):
+        return None
+    return bytes(out)
@@ -0,0 +1,200 @@
+import math
+import struct
+
+from PIL import Image, ImageDraw, ImageFont
+
+# The atlas reproduces Pillow's basic (non-raqm) text layout for default-anchor, single-line,
+# fontmode "1" text. Each glyph is rasterized once, alone, and blitted at the position
+# FreeType-backed draw.text would have used for it:
+#
+#   * x: pen positions are 26.6 fixed point (advance plus pair kerning), rounded per glyph.
+#   * y: Pillow places glyph bitmaps relative to the tallest *rendered* bitmap top in the
+#     string, but positions the string by its tallest outline *bounding box* top. For most
+#     glyphs the two agree; for some (e.g. Silkscreen's "." at 8px) they differ by a row,
+#     which moves every glyph in strings where that glyph is the tallest. Each glyph's
+#     rendered top is found once by drawing it after a reference glyph and comparing.
+#
+# Glyphs whose calibration doesn't reproduce Pillow exactly are marked unsupported, and
+# text containing them is drawn with draw.text as before.
+
+_MAX_TOP_SEARCH = 4
+
+
+def _half_away(v: float) -> int:
+    # C round(), which Pillow uses for the start offset.
+    return int(math.floor(v + 0.5)) if v >= 0 else -int(math.floor(-v + 0.5))
+
+
+def _pixel(v: int) -> int:
+    # Pillow's PIXEL(): 26.6 fixed point to the nearest whole pixel.
+    return ((v + 32) & -64) >> 6
+
+
+def _float32(v: float) -> float:
+    return struct.unpack("f", struct.pack("f", v))[0]
+
+
+class _Glyph:
+    __slots__ = ("mask", "dx", "dy", "box_top", "render_top")
+
+    def __init__(self, mask, dx: int, dy: int, box_top: int):
+        # Ink bitmap (mode "1", cropped) and its offset from the pen/baseline when drawn alone.
+        self.mask = mask
+        self.dx = dx
+        self.dy = dy
+        # max(0, outline bounding-box top) and max(0, rendered bitmap top), above the baseline.
+        self.box_top = box_top
+        self.render_top = box_top
+
+
+class GlyphAtlas:
+    """Cached 1-bit glyphs and advances for one FreeType font at one size."""
+
+    def __init__(self, font: "ImageFont.FreeTypeFont"):
+        self._font = font
+        self._ascent = font.getmetrics()[0]
+        self._glyphs = {}
+        self._unsupported = set()
+        self._advances = {}
+        self._kerning = {}
+        self._reference = None
+
+    def _advance(self, ch: str, mode: str) -> int:
+        key = (ch, mode)
+        adv = self._advances.get(key)
+        if adv is None:
+            adv = self._advances[key] = _half_away(self._font.getlength(ch, mode) * 64)
+        return adv
+
+    def _kern(self, a: str, b: str, mode: str) -> int:
+        key = (a, b, mode)
+        k = self._kerning.get(key)
+        if k is None:
+            pair = _half_away(self._font.getlength(a + b, mode) * 64)
+            k = self._kerning[key] = pair - self._advance(a, mode) - self._advance(b, mode)
+        return k
+
+    def _pens(self, text: str, mode: str):
+        pens = []
+        pen = 0
+        prev = None
+        for ch in text:
+            if prev is not None:
+                pen += self._kern(prev, ch, mode)
+            pens.append(pen)
+            pen += self._advance(ch, mode)
+            prev = ch
+        return pens, pen
+
+    def textlength(self, text: str, mode: str = "1") -> float:
+        """Same as font.getlength(text, mode), from cached advances."""
+        return self._pens(text, mode)[1] / 64
+
+    def _rasterize(self, ch: str) -> _Glyph:
+        left, top, right, bottom = self._font.getbbox(ch, "1", anchor="ls")
+        pad = 2
+        img = Image.new("1", (right - left + 2 * pad, bottom - top + 2 * pad), 0)
+        draw = ImageDraw.Draw(img)
+        draw.fontmode = "1"
+        origin = (pad - left, pad - top)
+        draw.text(origin, ch, fill=1, font=self._font, anchor="ls")
+        bbox = img.getbbox()
+        if bbox is None:
+            return _Glyph(None, 0, 0, max(0, -top))
+        return _Glyph(img.crop(bbox), bbox[0] - origin[0], bbox[1] - origin[1], max(0, -top))
+
+    def _reference_glyph(self):
+        # A tall, ordinary glyph: its rendered and bounding-box tops are taken to agree.
+        if self._reference is None:
+            for ch in "|Hl10":
+                g = self._rasterize(ch)
+                if g.mask is not None:
+                    self._reference = (ch, g)
+                    break
+        return self._reference
+
+    def _calibrate(self, ch: str, glyph: _Glyph) -> bool:
+        reference = self._reference_glyph()
+        if reference is None:
+            return False
+        ref_ch, ref_glyph = reference
+        if glyph.mask is None or ch == ref_ch:
+            return True
+
+        text = ref_ch + ch
+        size = (self._font.getbbox(text, "1")[2] + 8, self._ascent + 2 * self._font.size + 8)
+        expected = Image.new("1", size, 0)
+        draw = ImageDraw.Draw(expected)
+        draw.fontmode = "1"
+        draw.text((2, 2), text, fill=1, font=self._font)
+        expected = expected.tobytes()
+
+        glyphs = {ref_ch: ref_glyph, ch: glyph}
+        for render_top in range(0, max(glyph.box_top, ref_glyph.box_top) + _MAX_TOP_SEARCH):
+            glyph.render_top = render_top
+            candidate = Image.new("1", size, 0)
+            draw = ImageDraw.Draw(candidate)
+            self._blit(draw, (2, 2), text, 1, glyphs)
+            if candidate.tobytes() == expected:
+                return True
+        return False
+
+    def _glyph(self, ch: str):
+        glyph = self._glyphs.get(ch)
+        if glyph is None and ch not in self._unsupported:
+            glyph = self._rasterize(ch)
+            if self._calibrate(ch, glyph):
+                self._glyphs[ch] = glyph
+            else:
+                self._unsupported.add(ch)
+                glyph = None
+        return glyph
+
+    def supports(self, text: str) -> bool:
+        return "\n" not in text and all(self._glyph(ch) is not None for ch in text)
+
+    def _blit(self, draw, xy, text: str, fill, glyphs):
+        x, y = xy
+        pens, _ = self._pens(text, "1")
+        start_x = _half_away(_float32(math.modf(x)[0]) * 64)
+        shift_y = 1 if _half_away(_float32(math.modf(y)[0]) * 64) > 32 else 0
+
+        box_top = max(glyphs[ch].box_top for ch in text)
+        render_top = max(glyphs[ch].render_top for ch in text)
+        base_y = int(y) + self._ascent + shift_y
+
+        for ch, pen in zip(text, pens):
+            g = glyphs[ch]
+            if g.mask is None:
+                continue
+            gx = int(x) + _pixel(start_x + pen) + g.dx
+            gy = base_y + g.dy + (render_top - g.render_top) - (box_top - g.box_top)
+            draw.bitmap((gx, gy), g.mask, fill=fill)
+
+    def draw_text(self, draw: "ImageDraw.ImageDraw", xy, text: str, fill) -> bool:
+        """Draw like draw.text(xy, text, fill, font) with fontmode "1". False if the atlas can't."""
+        if not text or not self.supports(text):
+            return False
+        self._blit(draw, xy, text, fill, self._glyphs)
+        return True
+
+
+_ATLASES = {}
+
+
+def atlas_for(font):
+    """The shared GlyphAtlas for a FreeType font loaded from a file, or None for other fonts.
+
+    Only fonts using the basic layout get one: with raqm (the default wherever Pillow finds
+    libraqm), kerning and advances come from HarfBuzz and the atlas can't reproduce them.
+    """
+    path = getattr(font, "path", None)
+    if not isinstance(font, ImageFont.FreeTypeFont) or not isinstance(path, str):
+        return None
+    if font.layout_engine != ImageFont.Layout.BASIC:
+        return None
+    key = (path, font.size, font.index)
+    atlas = _ATLASES.get(key)
+    if atlas is None:
+        atlas = _ATLASES[key] = GlyphAtlas(font)
+    return atlas
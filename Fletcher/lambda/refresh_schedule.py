@@ -0,0 +1,119 @@
+"""Choose when to refresh next from the state of the rivers.
+
+A flat summer river can go an hour between renders; one rising towards (or past) the top
+of its normal range should be re-checked every few minutes. Each station gets an interval
+from three things, and the shortest wins:
+
+  * volatility: how fast the river has been moving up or down recently. Aim for about
+    STEP_M of change between refreshes.
+  * headroom: at the recent rate of rise, how long until the next threshold above it
+    (top_of_normal_range_m, then highest_ever_recorded_m). Look HEADROOM_CHECKS times on the way.
+  * elevation: above the top of the normal range, never wait longer than ELEVATED_MAX_S,
+    shrinking towards MIN_INTERVAL_S as the river nears its highest recorded level.
+
+Everything is worked out from a river level document (the stations' downsampled heights),
+so the same rules run in the Lambda, the local loop and offline replays.
+"""
+
+from datetime import datetime, timedelta
+
+MIN_INTERVAL_S = 5 * 60
+MAX_INTERVAL_S = 60 * 60
+ELEVATED_MAX_S = 15 * 60
+
+# Recent behaviour is judged over this much of each station's history.
+WINDOW_S = 6 * 60 * 60
+STEP_M = 0.02
+HEADROOM_CHECKS = 4
+
+
+def _clamp(interval_s: float) -> int:
+    interval_s = max(MIN_INTERVAL_S, min(MAX_INTERVAL_S, interval_s))
+    # Whole minutes: the finest EventBridge Scheduler resolution worth asking for.
+    return int(interval_s // 60) * 60
+
+
+def station_interval(station: dict) -> dict:
+    """The refresh interval one station asks for, with the numbers behind it.
+
+    Returns {"interval_s", "reason", "height_m", "rate_m_per_h", "volatility_m_per_h"},
+    or None if the station has no usable history.
+    """
+    heights = station.get("heights_m") or []
+    try:
+        first_ts = datetime.fromisoformat(station["first_timestamp_utc"])
+        last_ts = datetime.fromisoformat(station["last_timestamp_utc"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if len(heights) < 2 or last_ts <= first_ts:
+        return None
+
+    # Downsampled points are spread evenly enough through time to treat as a regular series.
+    point_s = (last_ts - first_ts).total_seconds() / (len(heights) - 1)
+    count = max(2, min(len(heights), int(round(WINDOW_S / point_s)) + 1))
+    recent = heights[-count:]
+    hours = (count - 1) * point_s / 3600.0
+    height_m = float(recent[-1])
+    rate_m_per_h = (recent[-1] - recent[0]) / hours
+    volatility_m_per_h = sum(abs(b - a) for a, b in zip(recent, recent[1:])) / hours
+
+    candidates = [(MAX_INTERVAL_S, "quiet")]
+    if volatility_m_per_h > 0:
+        candidates.append((STEP_M / volatility_m_per_h * 3600.0, "volatile"))
+
+    top = station.get("top_of_normal_range_m")
+    highest = station.get("highest_ever_recorded_m")
+    thresholds = [t for t in (top, highest) if isinstance(t, (int, float)) and t > height_m]
+    if thresholds and rate_m_per_h > 0:
+        time_to_threshold_s = (min(thresholds) - height_m) / rate_m_per_h * 3600.0
+        candidates.append((time_to_threshold_s / HEADROOM_CHECKS, "rising towards threshold"))
+
+    if isinstance(top, (int, float)) and height_m >= top:
+        elevated_max_s = ELEVATED_MAX_S
+        if isinstance(highest, (int, float)) and highest > top:
+            # 1 at the top of the normal range, 0 at the highest ever recorded.
+            remaining = max(0.0, min(1.0, (highest - height_m) / (highest - top)))
+            elevated_max_s = MIN_INTERVAL_S + (ELEVATED_MAX_S - MIN_INTERVAL_S) * remaining
+        candidates.append((elevated_max_s, "above normal range"))
+
+    interval_s, reason = min(candidates, key=lambda c: c[0])
+    return {
+        "interval_s": _clamp(interval_s),
+        "reason": reason,
+        "height_m": height_m,
+        "rate_m_per_h": round(rate_m_per_h, 4),
+        "volatility_m_per_h": round(volatility_m_per_h, 4),
+    }
+
+
+def next_refresh(doc: dict) -> dict:
+    """When to refresh after the run that produced doc.
+
+    Returns {"interval_s", "next_run_utc", "station", "reason", "stations": {name: station_interval}}.
+    With no usable stations it falls back to MAX_INTERVAL_S.
+    """
+    now = datetime.fromisoformat(doc["utc_time"])
+    per_station = {}
+    for station in doc.get("stations") or []:
+        plan = station_interval(station)
+        if plan is not None:
+            per_station[station.get("name")] = plan
+
+    if per_station:
+        name, chosen = min(per_station.items(), key=lambda kv: kv[1]["interval_s"])
+        interval_s, reason = chosen["interval_s"], chosen["reason"]
+    else:
+        name, interval_s, reason = None, MAX_INTERVAL_S, "no station data"
+
+    return {
+        "interval_s": interval_s,
+        "next_run_utc": (now + timedelta(seconds=interval_s)).isoformat(),
+        "station": name,
+        "reason": reason,
+        "stations": per_station,
+    }
+
+
+def at_expression(when: datetime) -> str:
+    """EventBridge Scheduler one-shot expression for when (UTC), e.g. "at(2026-01-27T15:00:00)"."""
+    return f"at({when.strftime('%Y-%m-%dT%H:%M:%S')})"
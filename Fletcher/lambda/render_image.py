@@ -1,5 +1,8 @@
+import hashlib
 import io
+import json
 import os
+import zlib
 from datetime import datetime
 
 try:
@@ -9,6 +12,9 @@ except ImportError as e:
         "Pillow (PIL) is required to render PNGs. Ensure the Lambda has the Pillow layer attached."
     ) from e
 
+import glyph_atlas
+import stage_timing
+
 
 def _format_utc(ts: str) -> str:
     try:
@@ -18,22 +24,47 @@ def _format_utc(ts: str) -> str:
         return str(ts)
 
 
+_FONT_CACHE = {}
+
+
+def _load_font(filename: str, size: int):
+    # Fonts are shared across renders so their glyph atlases (and FreeType faces) are too.
+    key = (filename, size)
+    font = _FONT_CACHE.get(key)
+    if font is None:
+        try:
+            here = os.path.dirname(__file__)
+            font = ImageFont.truetype(os.path.join(here, "fonts", filename), size)
+        except Exception:
+            font = ImageFont.load_default()
+        _FONT_CACHE[key] = font
+    return font
+
+
 def _load_large_font(size: int = 40):
-    try:
-        here = os.path.dirname(__file__)
-        font_path = os.path.join(here, "fonts", "Jersey20-Regular.ttf")
-        return ImageFont.truetype(font_path, size)
-    except Exception:
-        return ImageFont.load_default()
+    return _load_font("Jersey20-Regular.ttf", size)
 
 
 def _load_label_font(size: int = 16):
+    return _load_font("Silkscreen-Regular.ttf", size)
+
+
+def _draw_text(draw: "ImageDraw.ImageDraw", xy, text: str, fill, font):
+    """draw.text, blitting cached glyphs when the font has an atlas (same pixels, no FreeType)."""
+    atlas = glyph_atlas.atlas_for(font)
+    if atlas is not None and getattr(draw, "fontmode", None) == "1" and atlas.draw_text(draw, xy, text, fill):
+        return
+    draw.text(xy, text, fill=fill, font=font)
+
+
+def _text_length(draw: "ImageDraw.ImageDraw", text: str, font) -> float:
+    atlas = glyph_atlas.atlas_for(font)
+    if atlas is not None:
+        return atlas.textlength(text, getattr(draw, "fontmode", "L"))
     try:
-        here = os.path.dirname(__file__)
-        font_path = os.path.join(here, "fonts", "Silkscreen-Regular.ttf")
-        return ImageFont.truetype(font_path, size)
+        return draw.textlength(text, font=font)
     except Exception:
-        return ImageFont.load_default()
+        return font.getlength(text)
 
 
 def _draw_large_height(draw: "ImageDraw.ImageDraw", font: "ImageFont.ImageFont", value_m: float, decimal_x: int, y: int, color: str):
@@ -44,34 +75,40 @@ def _draw_large_height(draw: "ImageDraw.ImageDraw", font: "ImageFont.ImageFont",
         int_part, frac_part = s, "00"
 
     dot = "."
-    try:
-        int_w = draw.textlength(int_part, font=font)
-        dot_w = draw.textlength(dot, font=font)
-    except Exception:
-        int_w = font.getlength(int_part)
-        dot_w = font.getlength(dot)
+    int_w = _text_length(draw, int_part, font)
+    dot_w = _text_length(draw, dot, font)
 
-    draw.text((decimal_x - int_w, y), int_part, fill=color, font=font)
-    draw.text((decimal_x, y), dot, fill=color, font=font)
-    draw.text((decimal_x + dot_w, y), frac_part, fill=color, font=font)
+    _draw_text(draw, (decimal_x - int_w, y), int_part, fill=color, font=font)
+    _draw_text(draw, (decimal_x, y), dot, fill=color, font=font)
+    _draw_text(draw, (decimal_x + dot_w, y), frac_part, fill=color, font=font)
 
 
-def _draw_station_graph(draw: "ImageDraw.ImageDraw", font: "ImageFont.ImageFont", station: dict, x0: int, y0: int):
-    heights = station.get("heights_m") or []
+def _station_axis_range(station: dict):
+    """(y_axis_bottom_m, y_axis_top_m) as floats, or None if the station can't be plotted."""
     y_axis_top_m = station.get("y_axis_top_m")
     y_axis_bottom_m = station.get("y_axis_bottom_m")
+    if not isinstance(y_axis_bottom_m, (int, float)):
+        y_axis_bottom_m = 0.0
+    if isinstance(y_axis_top_m, (int, float)) and y_axis_top_m > y_axis_bottom_m:
+        return float(y_axis_bottom_m), float(y_axis_top_m)
+    return None
+
+
+def _draw_station_static(
+    draw: "ImageDraw.ImageDraw",
+    font: "ImageFont.ImageFont",
+    station: dict,
+    x0: int,
+    y0: int,
+    graph_width: int = 200,
+    graph_height: int = 100,
+):
+    """The parts of a station graph that only depend on river_config: title, axes, limits, reference lines."""
+    y_axis_top_m = station.get("y_axis_top_m")
     top_of_normal_range_m = station.get("top_of_normal_range_m")
     highest_ever_recorded_m = station.get("highest_ever_recorded_m")
-    first_ts = station.get("first_timestamp_utc", "")
-    last_ts = station.get("last_timestamp_utc", "")
 
-    title_h = 12
-    label_h = 12
-    graph_width = 200
-    graph_height = 100
-
-    title_y = y0
-    top_y = y0 + title_h
+    top_y = y0 + TITLE_H
     base_y = top_y + graph_height
     x_axis_end = x0 + graph_width
 
@@ -81,28 +118,32 @@ def _draw_station_graph(draw: "ImageDraw.ImageDraw", font: "ImageFont.ImageFont"
     except Exception:
         pass
 
-    draw.text((x0, title_y), str(station.get("name", "")), fill="black", font=font)
+    _draw_text(draw, (x0, y0), str(station.get("name", "")), fill="black", font=font)
 
     draw.line([(x0, base_y), (x_axis_end, base_y)], fill="black", width=1)
     draw.line([(x0, base_y), (x0, top_y)], fill="black", width=1)
     draw.line([(x_axis_end, base_y), (x_axis_end, top_y)], fill="black", width=1)
 
-    first_label = _format_utc(first_ts)
-    last_label = _format_utc(last_ts)
-    draw.text((x0, base_y + 2), first_label, fill="black", font=font)
-    draw.text((x_axis_end - 80, base_y + 2), last_label, fill="black", font=font)
-
-    if not isinstance(y_axis_bottom_m, (int, float)):
-        y_axis_bottom_m = 0.0
-
-    if (
-        isinstance(y_axis_top_m, (int, float))
-        and isinstance(y_axis_bottom_m, (int, float))
-        and y_axis_top_m > y_axis_bottom_m
-    ):
-        y_range = float(y_axis_top_m) - float(y_axis_bottom_m)
-        draw.text((x_axis_end + 5, base_y - 6), f"{float(y_axis_bottom_m):g}m", fill="black", font=font)
-        draw.text((x_axis_end + 5, top_y - 6), f"{y_axis_top_m:g}m", fill="black", font=font)
+    axis_range = _station_axis_range(station)
+    if axis_range is not None:
+        y_axis_bottom_m, _ = axis_range
+        y_range = axis_range[1] - y_axis_bottom_m
+        drawn_labels = []
+
+        def draw_labels(labels):
+            # On a short graph the labels can land on each other; keep the first and drop the rest.
+            # Measured with the atlas and the font's line height; textbbox would rasterize each one.
+            boxes = [(x, y, x + _text_length(draw, text, font), y + getattr(font, "size", 8)) for (x, y), text in labels]
+            for a in boxes:
+                for b in drawn_labels:
+                    if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                        return
+            for xy, text in labels:
+                _draw_text(draw, xy, text, fill="black", font=font)
+            drawn_labels.extend(boxes)
+
+        draw_labels([((x_axis_end + 5, base_y - 6), f"{y_axis_bottom_m:g}m")])
+        draw_labels([((x_axis_end + 5, top_y - 6), f"{y_axis_top_m:g}m")])
 
         def draw_ref_line(value_m, label: str):
             if not isinstance(value_m, (int, float)):
@@ -110,7 +151,7 @@ def _draw_station_graph(draw: "ImageDraw.ImageDraw", font: "ImageFont.ImageFont"
             if value_m < 0:
                 return
 
-            y = base_y - int(round(((float(value_m) - float(y_axis_bottom_m)) / y_range) * graph_height))
+            y = base_y - int(round(((float(value_m) - y_axis_bottom_m) / y_range) * graph_height))
             if y < top_y:
                 y = top_y
             if y > base_y:
@@ -118,8 +159,7 @@ def _draw_station_graph(draw: "ImageDraw.ImageDraw", font: "ImageFont.ImageFont"
 
             draw.line([(x0, y), (x_axis_end + 15, y)], fill="black", width=1)
             label_x = x_axis_end + 20
-            draw.text((label_x, y - 6), f"{float(value_m):g}m", fill="black", font=font)
-            draw.text((label_x, y + 6), label, fill="black", font=font)
+            draw_labels([((label_x, y - 6), f"{float(value_m):g}m"), ((label_x, y + 6), label)])
 
         draw_ref_line(top_of_normal_range_m, "Normal")
         draw_ref_line(highest_ever_recorded_m, "Record")
@@ -130,47 +170,304 @@ def _draw_station_graph(draw: "ImageDraw.ImageDraw", font: "ImageFont.ImageFont"
     except Exception:
         pass
 
-    if (
-        isinstance(y_axis_top_m, (int, float))
-        and isinstance(y_axis_bottom_m, (int, float))
-        and y_axis_top_m > y_axis_bottom_m
-        and len(heights) == 200
-    ):
-        y_range = float(y_axis_top_m) - float(y_axis_bottom_m)
-        for i, h in enumerate(heights):
-            x = x0 + 1 + i
-            try:
-                v = float(h)
-            except Exception:
-                continue
-
-            bar_h = int(round(((v - float(y_axis_bottom_m)) / y_range) * graph_height))
+
+def _draw_station_dynamic(
+    draw: "ImageDraw.ImageDraw",
+    font: "ImageFont.ImageFont",
+    station: dict,
+    x0: int,
+    y0: int,
+    graph_width: int = 200,
+    graph_height: int = 100,
+    bar_width: int = 1,
+):
+    """The parts of a station graph that change with the readings: time range labels and bars."""
+    heights = station.get("heights_m") or []
+    top_of_normal_range_m = station.get("top_of_normal_range_m")
+
+    top_y = y0 + TITLE_H
+    base_y = top_y + graph_height
+    x_axis_end = x0 + graph_width
+
+    old_fontmode = getattr(draw, "fontmode", None)
+    try:
+        draw.fontmode = "1"
+    except Exception:
+        pass
+
+    first_label = _format_utc(station.get("first_timestamp_utc", ""))
+    last_label = _format_utc(station.get("last_timestamp_utc", ""))
+    _draw_text(draw, (x0, base_y + 2), first_label, fill="black", font=font)
+    _draw_text(draw, (x_axis_end - 80, base_y + 2), last_label, fill="black", font=font)
+
+    try:
+        if old_fontmode is not None:
+            draw.fontmode = old_fontmode
+    except Exception:
+        pass
+
+    axis_range = _station_axis_range(station)
+    if axis_range is not None and len(heights) * bar_width == graph_width:
+        y_axis_bottom_m, y_axis_top_m = axis_range
+        black_mask, red_mask = _bar_masks(
+            heights, y_axis_bottom_m, y_axis_top_m - y_axis_bottom_m, graph_height, bar_width, top_of_normal_range_m
+        )
+        # Each mask covers the columns right of the y-axis, from the top of the graph down to the x-axis row.
+        origin = (x0 + 1, base_y - graph_height)
+        if black_mask is not None:
+            draw.bitmap(origin, black_mask, fill="black")
+        if red_mask is not None:
+            draw.bitmap(origin, red_mask, fill="red")
+
+
+def _bar_masks(heights, y_axis_bottom_m: float, y_range: float, graph_height: int, bar_width: int, top_of_normal_range_m):
+    """Rasterize the bars as two L-mode masks (black, red) of len(heights) * bar_width x (graph_height + 1).
+
+    Bar i fills rows graph_height - bar_h .. graph_height of its columns, the same pixels a
+    one-pixel draw.line from the x-axis up to base_y - bar_h would. Columns are built as byte
+    strings and transposed into place, so the whole graph is two bitmap draws instead of a
+    line per bar. A mask is None if no bar uses that colour.
+    """
+    rows = graph_height + 1
+    empty = b"\x00" * rows
+    red_limit = top_of_normal_range_m if isinstance(top_of_normal_range_m, (int, float)) else None
+
+    black_cols = []
+    red_cols = []
+    any_black = any_red = False
+    for h in heights:
+        bar_h = 0
+        try:
+            v = float(h)
+        except Exception:
+            v = None
+        if v is not None:
+            bar_h = int(round(((v - y_axis_bottom_m) / y_range) * graph_height))
             if bar_h < 0:
                 bar_h = 0
             if bar_h > graph_height:
                 bar_h = graph_height
-            if bar_h == 0:
-                continue
 
+        if bar_h == 0:
+            black_col = red_col = empty
+        else:
+            col = b"\x00" * (graph_height - bar_h) + b"\xff" * (bar_h + 1)
             # Use red if value >= top_of_normal_range
-            color = "black"
-            if isinstance(top_of_normal_range_m, (int, float)) and v >= top_of_normal_range_m:
-                color = "red"
+            if red_limit is not None and v >= red_limit:
+                black_col, red_col = empty, col
+                any_red = True
+            else:
+                black_col, red_col = col, empty
+                any_black = True
+
+        black_cols.extend([black_col] * bar_width)
+        red_cols.extend([red_col] * bar_width)
+
+    def to_mask(cols):
+        # Column-major bytes are a (rows x columns) image of the transpose.
+        return Image.frombytes("L", (rows, len(cols)), b"".join(cols)).transpose(Image.Transpose.TRANSPOSE)
+
+    return (to_mask(black_cols) if any_black else None, to_mask(red_cols) if any_red else None)
+
+
+def _draw_station_graph(
+    draw: "ImageDraw.ImageDraw",
+    font: "ImageFont.ImageFont",
+    station: dict,
+    x0: int,
+    y0: int,
+    graph_width: int = 200,
+    graph_height: int = 100,
+    bar_width: int = 1,
+):
+    _draw_station_static(draw, font, station, x0, y0, graph_width, graph_height)
+    _draw_station_dynamic(draw, font, station, x0, y0, graph_width, graph_height, bar_width)
+    return TITLE_H + graph_height + LABEL_H
+
 
-            draw.line([(x, base_y), (x, base_y - bar_h)], fill=color, width=1)
+# Fixed pieces of the station block, sized for the 8px label font.
+TITLE_H = 12
+LABEL_H = 12
+# The clock sits at the top right, with the "Updated" date above it.
+CLOCK_Y = 15
+CLOCK_FONT_SIZE = 26
 
-    return title_h + graph_height + label_h
+# Reference geometry: the original 2-station 400x300 design.
+_BASE_WIDTH = 400
+_BASE_HEIGHT = 300
+_BASE_GRAPH_HEIGHT = 100
+_BASE_BLOCK_H = TITLE_H + _BASE_GRAPH_HEIGHT + LABEL_H
+_POINTS_PER_GRAPH = 200
 
+_LAYOUT_CACHE = {}
 
-def _render_latest_image(river_doc: dict) -> "Image.Image":
-    """Generate 3-color image with red elements when river >= top_of_normal_range."""
-    img = Image.new("RGB", (400, 300), "white")
+
+def compute_layout(width: int, height: int, station_count: int) -> dict:
+    """Work out where everything goes for station_count stations on a width x height display.
+    
+    Stations are stacked top to bottom, each a graph on the left with its short name and
+    large current height on the right. Graph height, the large fonts and their offsets
+    shrink to fit more stations, and bars get wider on wider displays. Once they've shrunk
+    far enough that the first station's name would reach up into the clock, the stack
+    starts below the clock instead. For 1 or 2 stations on 400x300 this is exactly the
+    original hand-placed layout.
+    
+    Layouts are memoized per (width, height, station_count) and must be treated as read-only.
+    """
+    key = (width, height, station_count)
+    layout = _LAYOUT_CACHE.get(key)
+    if layout is not None:
+        return layout
+
+    scale = min(width / _BASE_WIDTH, height / _BASE_HEIGHT)
+    x0 = 10
+    top_y = 20
+    gap = 15
+    bottom_margin = 5
+    ref_labels_w = 65
+
+    decimal_x = width - int(round(90 * scale))
+    name_dx = int(round(25 * scale))
+    bar_width = max(1, (decimal_x - name_dx - x0 - ref_labels_w) // _POINTS_PER_GRAPH)
+    graph_width = _POINTS_PER_GRAPH * bar_width
+
+    slots = max(1, station_count)
+
+    def fit(top_y):
+        fit_h = (height - top_y - bottom_margin - slots * (TITLE_H + LABEL_H) - (slots - 1) * gap) // slots
+        graph_height = max(10, min(int(round(_BASE_GRAPH_HEIGHT * scale)), fit_h))
+        block_h = TITLE_H + graph_height + LABEL_H
+        return graph_height, block_h, block_h / _BASE_BLOCK_H
+
+    graph_height, block_h, font_scale = fit(top_y)
+    # The first station's name is the only thing on the right that could reach the clock.
+    clock_bottom = CLOCK_Y + CLOCK_FONT_SIZE
+    if top_y + int(round(28 * font_scale)) < clock_bottom:
+        top_y = clock_bottom
+        graph_height, block_h, font_scale = fit(top_y)
+
+    stations = []
+    y0 = top_y
+    for _ in range(station_count):
+        stations.append(
+            {
+                "x0": x0,
+                "y0": y0,
+                "graph_width": graph_width,
+                "graph_height": graph_height,
+                "bar_width": bar_width,
+                "decimal_x": decimal_x,
+                "name_x": decimal_x - int(round(name_dx * font_scale)),
+                "name_y": y0 + int(round(28 * font_scale)),
+                "height_y": y0 + int(round(48 * font_scale)),
+            }
+        )
+        y0 = y0 + block_h + gap
+
+    layout = {
+        "width": width,
+        "height": height,
+        "right_margin": 10,
+        "large_font_size": int(round(70 * font_scale)),
+        "station_font_size": int(round(26 * font_scale)),
+        "clock_font_size": CLOCK_FONT_SIZE,
+        "label_font_size": 8,
+        "stations": tuple(stations),
+    }
+    _LAYOUT_CACHE[key] = layout
+    return layout
+
+
+# Frames are drawn into a 3-entry palette image. Every encoder only needs to know which of
+# these three a pixel is, and in P mode that's the pixel value itself.
+WHITE = 0
+BLACK = 1
+RED = 2
+_PALETTE = [255, 255, 255, 0, 0, 0, 255, 0, 0]
+
+
+def _new_canvas(width: int, height: int) -> "Image.Image":
+    img = Image.new("P", (width, height), WHITE)
+    img.putpalette(_PALETTE)
+    return img
+
+
+# Station fields the static layer depends on. Anything else in a station doc changes every run.
+_STATIC_STATION_KEYS = ("name", "y_axis_bottom_m", "y_axis_top_m", "top_of_normal_range_m", "highest_ever_recorded_m")
+_STATIC_LAYER_CACHE = {}
+_STATIC_LAYER_CACHE_MAX = 32
+
+
+def _static_layer_key(stations, layout: dict) -> str:
+    config = [
+        layout["width"],
+        layout["height"],
+        # The short name is only drawn for stations that have readings.
+        [[s.get(k) for k in _STATIC_STATION_KEYS] + [bool(s.get("heights_m"))] for s in stations],
+    ]
+    return hashlib.sha256(json.dumps(config, default=str).encode("utf-8")).hexdigest()
+
+
+def _static_layer(stations, layout: dict) -> "Image.Image":
+    """Everything that only changes when river_config or the display size does.
+
+    Drawn once per configuration (keyed by a hash of the fields it uses) and kept for the
+    life of the process, so a warm Lambda container only draws the readings. The layout
+    keeps static and per-run elements apart, so drawing the readings over a copy of this
+    gives the same pixels as drawing everything in one pass. Treat the result as read-only.
+    """
+    key = _static_layer_key(stations, layout)
+    img = _STATIC_LAYER_CACHE.get(key)
+    if img is not None:
+        return img
+
+    img = _new_canvas(layout["width"], layout["height"])
     draw = ImageDraw.Draw(img)
-    label_font = _load_label_font(8)
-    large_font = _load_large_font(70)
-    station_font = _load_large_font(26)
-    small_font = _load_label_font(8)
+    label_font = _load_label_font(layout["label_font_size"])
+    station_font = _load_large_font(layout["station_font_size"])
+
+    for station, box in zip(stations, layout["stations"]):
+        _draw_station_static(
+            draw,
+            label_font,
+            station,
+            x0=box["x0"],
+            y0=box["y0"],
+            graph_width=box["graph_width"],
+            graph_height=box["graph_height"],
+        )
+        if not station.get("heights_m"):
+            continue
+
+        station_name = str(station.get("name", "")).strip()
+        short_name = (station_name.split() or [""])[0]
+
+        old_fontmode = getattr(draw, "fontmode", None)
+        try:
+            draw.fontmode = "1"
+        except Exception:
+            pass
+
+        _draw_text(draw, (box["name_x"], box["name_y"]), short_name, fill="black", font=station_font)
+
+        try:
+            if old_fontmode is not None:
+                draw.fontmode = old_fontmode
+        except Exception:
+            pass
+
+    if len(_STATIC_LAYER_CACHE) >= _STATIC_LAYER_CACHE_MAX:
+        _STATIC_LAYER_CACHE.clear()
+    _STATIC_LAYER_CACHE[key] = img
+    return img
+
+
+def _render_latest_image(river_doc: dict, size: tuple = (_BASE_WIDTH, _BASE_HEIGHT)) -> "Image.Image":
+    """Generate 3-color RGB image with red elements when river >= top_of_normal_range."""
+    return _render_latest_indexed(river_doc, size).convert("RGB")
+
 
+def _header_labels(river_doc: dict):
     utc_time = river_doc.get("utc_time", "")
     try:
         dt = datetime.fromisoformat(utc_time.replace("Z", "+00:00"))
@@ -179,30 +476,54 @@ def _render_latest_image(river_doc: dict) -> "Image.Image":
     except Exception:
         time_label = str(utc_time)
         date_label = ""
+    return time_label, f"Updated {date_label}".strip()
 
+
+def _draw_header(draw: "ImageDraw.ImageDraw", layout: dict, time_label: str, updated_date_label: str):
+    clock_font = _load_large_font(layout["clock_font_size"])
+    small_font = _load_label_font(layout["label_font_size"])
+
+    time_w = _text_length(draw, time_label, clock_font)
+    updated_date_w = _text_length(draw, updated_date_label, small_font)
+
+    right_margin = layout["right_margin"]
+    x_time = layout["width"] - right_margin - time_w
+    x_updated_date = layout["width"] - right_margin - updated_date_w
+
+    old_fontmode = getattr(draw, "fontmode", None)
     try:
-        time_w = draw.textlength(time_label, font=station_font)
+        draw.fontmode = "1"
     except Exception:
-        time_w = station_font.getlength(time_label)
+        pass
+
+    _draw_text(draw, (x_updated_date, 1), updated_date_label, fill="black", font=small_font)
+    _draw_text(draw, (x_time, CLOCK_Y), time_label, fill="black", font=clock_font)
 
-    updated_date_label = f"Updated {date_label}".strip()
     try:
-        updated_date_w = draw.textlength(updated_date_label, font=small_font)
+        if old_fontmode is not None:
+            draw.fontmode = old_fontmode
     except Exception:
-        updated_date_w = small_font.getlength(updated_date_label)
+        pass
+
+
+def _height_color(station: dict) -> str:
+    # Use red for height label if value >= top_of_normal_range
+    heights = station.get("heights_m") or []
+    top_of_normal = station.get("top_of_normal_range_m")
+    if heights and isinstance(top_of_normal, (int, float)) and float(heights[-1]) >= top_of_normal:
+        return "red"
+    return "black"
 
-    right_margin = 10
-    x_time = 400 - right_margin - time_w
-    x_updated_date = 400 - right_margin - updated_date_w
 
+def _draw_station_height(draw: "ImageDraw.ImageDraw", layout: dict, box: dict, value_m: float, color: str):
     old_fontmode = getattr(draw, "fontmode", None)
     try:
         draw.fontmode = "1"
     except Exception:
         pass
 
-    draw.text((x_updated_date, 1), updated_date_label, fill="black", font=small_font)
-    draw.text((x_time, 15), time_label, fill="black", font=station_font)
+    large_font = _load_large_font(layout["large_font_size"])
+    _draw_large_height(draw, large_font, value_m, decimal_x=box["decimal_x"], y=box["height_y"], color=color)
 
     try:
         if old_fontmode is not None:
@@ -210,187 +531,239 @@ def _render_latest_image(river_doc: dict) -> "Image.Image":
     except Exception:
         pass
 
-    stations = river_doc.get("stations") or []
-    x0 = 10
-    y0 = 20
-    gap = 15
-    decimal_x = 310
-
-    if len(stations) >= 1:
-        used_h = _draw_station_graph(draw, label_font, stations[0], x0=x0, y0=y0)
-        heights_0 = stations[0].get("heights_m") or []
-        if heights_0:
-            station_name_0 = str(stations[0].get("name", "")).strip()
-            short_0 = (station_name_0.split() or [""])[0]
-
-            old_fontmode = getattr(draw, "fontmode", None)
-            try:
-                draw.fontmode = "1"
-            except Exception:
-                pass
-
-            draw.text((decimal_x - 25, y0 + 28), short_0, fill="black", font=station_font)
-            
-            # Use red for height label if value >= top_of_normal_range
-            height_color = "black"
-            top_of_normal = stations[0].get("top_of_normal_range_m")
-            if isinstance(top_of_normal, (int, float)) and float(heights_0[-1]) >= top_of_normal:
-                height_color = "red"
-            
-            _draw_large_height(draw, large_font, float(heights_0[-1]), decimal_x=decimal_x, y=y0 + 48, color=height_color)
-
-            try:
-                if old_fontmode is not None:
-                    draw.fontmode = old_fontmode
-            except Exception:
-                pass
-        y0 = y0 + used_h + gap
-
-    if len(stations) >= 2:
-        _draw_station_graph(draw, label_font, stations[1], x0=x0, y0=y0)
-        heights_1 = stations[1].get("heights_m") or []
-        if heights_1:
-            station_name_1 = str(stations[1].get("name", "")).strip()
-            short_1 = (station_name_1.split() or [""])[0]
-
-            old_fontmode = getattr(draw, "fontmode", None)
-            try:
-                draw.fontmode = "1"
-            except Exception:
-                pass
-
-            draw.text((decimal_x - 25, y0 + 28), short_1, fill="black", font=station_font)
-            
-            # Use red for height label if value >= top_of_normal_range
-            height_color = "black"
-            top_of_normal = stations[1].get("top_of_normal_range_m")
-            if isinstance(top_of_normal, (int, float)) and float(heights_1[-1]) >= top_of_normal:
-                height_color = "red"
-            
-            _draw_large_height(draw, large_font, float(heights_1[-1]), decimal_x=decimal_x, y=y0 + 48, color=height_color)
-
-            try:
-                if old_fontmode is not None:
-                    draw.fontmode = old_fontmode
-            except Exception:
-                pass
 
+# Per-run content is drawn as tiles: the header, each station's graph (time labels and bars)
+# and each station's large height. A tile is the ink one of those draws produces, keyed by a
+# hash of everything the draw depends on, so a region whose inputs haven't changed since an
+# earlier render is pasted rather than redrawn.
+#
+# Tiles are drawn with index 0 as "nothing drawn", so getbbox() finds the ink, and the
+# remaining indices are the frame's WHITE, BLACK and RED shifted up by one.
+_TILE_PALETTE = [0, 255, 0] + _PALETTE
+_TILE_TO_FRAME_LUT = [max(i - 1, 0) for i in range(256)]
+_TILE_MASK_LUT = [0] + [255] * 255
+_TILE_CACHE = {}
+_TILE_CACHE_MAX = 256
+_TILE_SCRATCH = {}
+
+
+def _tile(key: list, size: tuple, draw_fn):
+    """(position, P-mode ink, L-mode mask) for draw_fn's output, or None if it drew nothing."""
+    digest = hashlib.sha256(json.dumps(key, default=str).encode("utf-8")).hexdigest()
+    if digest in _TILE_CACHE:
+        return _TILE_CACHE[digest]
+
+    # One blank canvas per frame size, wiped back to 0 over whatever each tile drew.
+    canvas = _TILE_SCRATCH.get(size)
+    if canvas is None:
+        canvas = _TILE_SCRATCH[size] = Image.new("P", size, 0)
+        canvas.putpalette(_TILE_PALETTE)
+    try:
+        draw_fn(ImageDraw.Draw(canvas))
+    except Exception:
+        # Don't leave a half-drawn tile behind on the shared canvas.
+        del _TILE_SCRATCH[size]
+        raise
+    bbox = canvas.getbbox()
+    tile = None
+    if bbox is not None:
+        drawn = canvas.crop(bbox)
+        canvas.paste(0, bbox)
+        ink = drawn.point(_TILE_TO_FRAME_LUT)
+        ink.putpalette(_PALETTE)
+        mask = Image.frombytes("L", drawn.size, drawn.tobytes()).point(_TILE_MASK_LUT)
+        tile = ((bbox[0], bbox[1]), ink, mask)
+
+    if len(_TILE_CACHE) >= _TILE_CACHE_MAX:
+        _TILE_CACHE.clear()
+    _TILE_CACHE[digest] = tile
+    return tile
+
+
+@stage_timing.timed("draw_image")
+def _render_latest_indexed(river_doc: dict, size: tuple = (_BASE_WIDTH, _BASE_HEIGHT)) -> "Image.Image":
+    """Generate the frame as a P-mode image whose pixels are WHITE, BLACK or RED."""
+    width, height = size
+    stations = river_doc.get("stations") or []
+    layout = compute_layout(width, height, len(stations))
+    layout_key = [width, height, len(stations)]
+
+    time_label, updated_date_label = _header_labels(river_doc)
+    tiles = [
+        _tile(
+            ["header", layout_key, time_label, updated_date_label],
+            size,
+            lambda draw: _draw_header(draw, layout, time_label, updated_date_label),
+        )
+    ]
+
+    for i, (station, box) in enumerate(zip(stations, layout["stations"])):
+        heights = station.get("heights_m") or []
+        graph_key = ["graph", layout_key, i] + [
+            station.get(k)
+            for k in ("first_timestamp_utc", "last_timestamp_utc", "y_axis_bottom_m", "y_axis_top_m", "top_of_normal_range_m")
+        ] + [heights]
+        tiles.append(
+            _tile(
+                graph_key,
+                size,
+                lambda draw, station=station, box=box: _draw_station_dynamic(
+                    draw,
+                    _load_label_font(layout["label_font_size"]),
+                    station,
+                    x0=box["x0"],
+                    y0=box["y0"],
+                    graph_width=box["graph_width"],
+                    graph_height=box["graph_height"],
+                    bar_width=box["bar_width"],
+                ),
+            )
+        )
+        if not heights:
+            continue
+
+        value_m = float(heights[-1])
+        color = _height_color(station)
+        tiles.append(
+            _tile(
+                ["height", layout_key, i, value_m, color],
+                size,
+                lambda draw, box=box, value_m=value_m, color=color: _draw_station_height(draw, layout, box, value_m, color),
+            )
+        )
+
+    # Composite in drawing order, so where regions overlap the later one wins, as it did when drawn.
+    img = _static_layer(stations, layout).copy()
+    for tile in tiles:
+        if tile is not None:
+            position, ink, mask = tile
+            img.paste(ink, position, mask)
     return img
 
 
-def render_latest_3color_png(river_doc: dict) -> bytes:
-    """Generate 3-color PNG with red elements."""
-    img = _render_latest_image(river_doc)
+def _plane(indexed: "Image.Image", on) -> bytes:
+    """Pack a P-mode frame into a 1-bit plane, MSB first along each row, with bits set where the pixel is in `on`."""
+    width, height = indexed.size
+    if width % 8 != 0:
+        raise ValueError(f"Framebuffer width must be a multiple of 8, got {width}x{height}")
+    lut = [255 if i in on else 0 for i in range(256)]
+    indices = Image.frombytes("L", indexed.size, indexed.tobytes())
+    return indices.point(lut).convert("1", dither=Image.Dither.NONE).tobytes()
+
+
+# PNGs are written as palette images at the smallest bit depth (1 bit for latest.png, 2 for
+# latest_3c.png). Pillow leaves palette rows unfiltered, so what's left to tune is zlib:
+# Z_RLE suits frames that are mostly long runs of white and is several times faster than the
+# default strategy for about the same size. Both can be overridden per call.
+PNG_ZLIB_STRATEGIES = {
+    "default": zlib.Z_DEFAULT_STRATEGY,
+    "filtered": zlib.Z_FILTERED,
+    "huffman": zlib.Z_HUFFMAN_ONLY,
+    "rle": zlib.Z_RLE,
+    "fixed": zlib.Z_FIXED,
+}
+DEFAULT_PNG_COMPRESS_LEVEL = 9
+
+
+def _png_compress_level_from_env() -> int:
+    # Read at import, so a bad value mustn't take the whole Lambda down with it.
+    try:
+        level = int(os.environ.get("PNG_COMPRESS_LEVEL", DEFAULT_PNG_COMPRESS_LEVEL))
+    except ValueError:
+        return DEFAULT_PNG_COMPRESS_LEVEL
+    return level if 0 <= level <= 9 else DEFAULT_PNG_COMPRESS_LEVEL
+
+
+PNG_COMPRESS_LEVEL = _png_compress_level_from_env()
+PNG_ZLIB_STRATEGY = os.environ.get("PNG_ZLIB_STRATEGY", "rle")
+
+# latest.png is two-colour: RED pixels are drawn black.
+_MONO_PNG_LUT = [WHITE] + [BLACK] * 255
+_MONO_PNG_PALETTE = [255, 255, 255, 0, 0, 0]
+
+
+def _save_palette_png(img: "Image.Image", bits: int, compress_level: int = None, strategy: str = None) -> bytes:
+    compress_level = PNG_COMPRESS_LEVEL if compress_level is None else compress_level
+    strategy = PNG_ZLIB_STRATEGY if strategy is None else strategy
+    if strategy not in PNG_ZLIB_STRATEGIES:
+        raise ValueError(f"Unknown PNG zlib strategy {strategy!r}, expected one of {sorted(PNG_ZLIB_STRATEGIES)}")
     out = io.BytesIO()
-    img.save(out, format="PNG")
+    img.save(
+        out,
+        format="PNG",
+        bits=bits,
+        compress_level=compress_level,
+        compress_type=PNG_ZLIB_STRATEGIES[strategy],
+    )
     return out.getvalue()
 
 
-def render_latest_png(river_doc: dict) -> bytes:
-    """Generate 2-color PNG by converting 3-color image to black & white.
+@stage_timing.timed("render_3color_png")
+def render_latest_3color_png(
+    river_doc: dict,
+    size: tuple = (_BASE_WIDTH, _BASE_HEIGHT),
+    compress_level: int = None,
+    strategy: str = None,
+) -> bytes:
+    """Generate 3-color PNG with red elements, as a 2-bit palette image."""
+    return _save_palette_png(_render_latest_indexed(river_doc, size), 2, compress_level, strategy)
+
+
+@stage_timing.timed("render_png")
+def render_latest_png(
+    river_doc: dict,
+    size: tuple = (_BASE_WIDTH, _BASE_HEIGHT),
+    compress_level: int = None,
+    strategy: str = None,
+) -> bytes:
+    """Generate 2-color PNG by converting 3-color image to black & white, as a 1-bit palette image.
     
     Red pixels are converted to black for 2-color displays.
     """
-    img_3color = _render_latest_image(river_doc)
-    width, height = img_3color.size
-    img_bw = Image.new("RGB", (width, height), "white")
-    pixels_3color = img_3color.load()
-    pixels_bw = img_bw.load()
-    
-    for y in range(height):
-        for x in range(width):
-            r, g, b = pixels_3color[x, y]
-            # Check if pixel is red (high red, low green/blue) or black
-            is_red = (r > 200 and g < 100 and b < 100)
-            is_black = (r < 100 and g < 100 and b < 100)
-            
-            if is_red or is_black:
-                # Convert red and black to black
-                pixels_bw[x, y] = (0, 0, 0)
-            else:
-                # Keep white as white
-                pixels_bw[x, y] = (255, 255, 255)
-    
-    out = io.BytesIO()
-    img_bw.save(out, format="PNG")
-    return out.getvalue()
+    img_bw = _render_latest_indexed(river_doc, size).point(_MONO_PNG_LUT)
+    img_bw.putpalette(_MONO_PNG_PALETTE)
+    return _save_palette_png(img_bw, 1, compress_level, strategy)
 
 
-def render_latest_mono_hlsb_black(river_doc: dict) -> bytes:
+@stage_timing.timed("render_mono_bin")
+def render_latest_mono_hlsb_black(river_doc: dict, size: tuple = (_BASE_WIDTH, _BASE_HEIGHT)) -> bytes:
     """Generate 2-color framebuffer by converting 3-color image to black & white."""
-    img_3color = _render_latest_image(river_doc)
-    mono = img_3color.convert("1", dither=Image.Dither.NONE)
-    width, height = mono.size
-    if width != 400 or height != 300:
-        raise ValueError(f"Expected 400x300 image, got {width}x{height}")
-
-    pixels = mono.load()
-    out = bytearray((width * height) // 8)
-
-    idx = 0
-    for y in range(height):
-        for x_byte in range(0, width, 8):
-            b = 0
-            for bit in range(8):
-                x = x_byte + bit
-                px = pixels[x, y]
-                if px:
-                    b |= 1 << (7 - bit)
-            out[idx] = b
-            idx += 1
-
-    return bytes(out)
-
-
-def render_latest_3color_bin(river_doc: dict) -> bytes:
+    # Bit set = white; black and red pixels are both ink.
+    return _plane(_render_latest_indexed(river_doc, size), (WHITE,))
+
+
+@stage_timing.timed("render_3color_bin")
+def render_latest_3color_bin(river_doc: dict, size: tuple = (_BASE_WIDTH, _BASE_HEIGHT)) -> bytes:
     """Generate 3-color framebuffer: 15000 bytes black plane + 15000 bytes red plane.
     
     Total: 30000 bytes for 400x300 display with black and red channels.
     """
-    img = _render_latest_image(river_doc)
-    width, height = img.size
-    if width != 400 or height != 300:
-        raise ValueError(f"Expected 400x300 image, got {width}x{height}")
-
-    pixels = img.load()
-    black_plane = bytearray((width * height) // 8)
-    red_plane = bytearray((width * height) // 8)
-
-    idx = 0
-    for y in range(height):
-        for x_byte in range(0, width, 8):
-            black_byte = 0
-            red_byte = 0
-            for bit in range(8):
-                x = x_byte + bit
-                r, g, b = pixels[x, y]
-                
-                # Check if pixel is red (high red, low green/blue)
-                is_red = (r > 200 and g < 100 and b < 100)
-                # Check if pixel is black (all channels low)
-                is_black = (r < 100 and g < 100 and b < 100)
-                
-                # Note: Waveshare driver inverts red plane with ~redImage[...] on transmit
-                # So we need to invert our encoding:
-                # - White: black=1, red=0 (driver inverts red to 1 = no red shown)
-                # - Black: black=0, red=0 (driver inverts red to 1 = no red shown)
-                # - Red:   black=1, red=1 (driver inverts red to 0 = red shown)
-                
-                if not is_black and not is_red:
-                    # White: set black bit, clear red bit
-                    black_byte |= 1 << (7 - bit)
-                    # red_byte bit stays 0
-                elif is_red:
-                    # Red: set both bits (driver will invert red to show red)
-                    black_byte |= 1 << (7 - bit)
-                    red_byte |= 1 << (7 - bit)
-                else:
-                    # Black: clear both bits (both stay 0)
-                    pass
-            
-            black_plane[idx] = black_byte
-            red_plane[idx] = red_byte
-            idx += 1
+    img = _render_latest_indexed(river_doc, size)
+
+    # Note: Waveshare driver inverts red plane with ~redImage[...] on transmit
+    # So we need to invert our encoding:
+    # - White: black=1, red=0 (driver inverts red to 1 = no red shown)
+    # - Black: black=0, red=0 (driver inverts red to 1 = no red shown)
+    # - Red:   black=1, red=1 (driver inverts red to 0 = red shown)
+    black_plane = _plane(img, (WHITE, RED))
+    red_plane = _plane(img, (RED,))
 
     # Concatenate black plane followed by red plane
-    return bytes(black_plane + red_plane)
+    return black_plane + red_plane
+
+
+def frame_crc32(frame_bytes: bytes) -> str:
+    """CRC32 of a framebuffer as 8 lowercase hex digits.
+    
+    Matches binascii.crc32 on the Pico, so Pinky can tell whether a published
+    frame is pixel-identical to the one already on its panel.
+    """
+    return f"{zlib.crc32(frame_bytes) & 0xFFFFFFFF:08x}"
+
+
+def chunk_crc32s(frame_bytes: bytes, chunk_size: int) -> str:
+    """Comma-separated CRC32s of each chunk_size slice of a framebuffer.
+    
+    Lets Pinky check each Range: chunk as it arrives and resume from the last good one.
+    """
+    return ",".join(frame_crc32(frame_bytes[i:i + chunk_size]) for i in range(0, len(frame_bytes), chunk_size))
@@ -1,3 +1,8 @@
+# Each station's "url" is its full-history CSV. A station can also set
+#   "source": "ea_readings",
+#   "readings_url": "https://environment.data.gov.uk/flood-monitoring/id/measures/<measure>/readings",
+# to fetch only new readings from the EA real-time API on warm invocations (see ea_readings.py);
+# the CSV is still used for the first load and whenever the API leaves a gap.
 STATIONS = [
     {
         "name": "Marlow Downstream",
@@ -16,3 +21,23 @@ STATIONS = [
         "y_axis_top_m": 2.0,
     },
 ]
+
+# Device profiles for batch mode: one entry per kind of Pinky display.
+# - id: artifacts are written under profiles/<id>/
+# - stations: names from STATIONS, top to bottom
+# - colours: "2" (latest.png/.bin), "3" (latest_3c.png/.bin) or "both"
+# - size: display size in pixels
+DEVICE_PROFILES = [
+    {
+        "id": "marlow-cookham",
+        "stations": ["Marlow Downstream", "Cookham Upstream"],
+        "colours": "both",
+        "size": [400, 300],
+    },
+    {
+        "id": "cookham-marlow-3c",
+        "stations": ["Cookham Upstream", "Marlow Downstream"],
+        "colours": "3",
+        "size": [400, 300],
+    },
+]
@@ -1,16 +1,23 @@
 import csv
+import hashlib
 import io
+import math
 import urllib.request
-from datetime import datetime, timezone
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 
+import ea_readings
+import stage_timing
 from LTTBalgrithm import largest_triangle_three_buckets
 
 
+@stage_timing.timed("fetch_csv")
 def _fetch_csv_text(url: str, timeout_seconds: int = 15) -> str:
     with urllib.request.urlopen(url, timeout=timeout_seconds) as response:
         return response.read().decode("utf-8")
 
 
+@stage_timing.timed("parse_csv")
 def _parse_csv(csv_text: str):
     stream = io.StringIO(csv_text)
     reader = csv.reader(stream)
@@ -44,6 +51,7 @@ def _parse_csv(csv_text: str):
     return points, first_ts, last_ts
 
 
+@stage_timing.timed("lttb")
 def _downsample_to_heights(points, threshold: int):
     if len(points) == threshold:
         downsampled = points
@@ -57,45 +65,299 @@ def _downsample_to_heights(points, threshold: int):
     return heights
 
 
-def build_river_level_document(stations, threshold: int = 200):
-    now = datetime.now(timezone.utc)
+# A warm container often fetches a CSV byte-identical to last time's (the gauges report every
+# 15 minutes; the schedule and watch runs come more often). Keyed by the body's digest and
+# the threshold: (heights, first_ts, last_ts, row count), least recently used evicted first.
+_DOWNSAMPLE_MEMO = OrderedDict()
+_DOWNSAMPLE_MEMO_MAX = 32
+
+
+def _downsample_csv(csv_text: str, threshold: int):
+    """(heights, first_ts, last_ts, count) for a CSV body, reusing the last result for the same bytes."""
+    key = (hashlib.sha256(csv_text.encode("utf-8")).digest(), threshold)
+    hit = _DOWNSAMPLE_MEMO.get(key)
+    if hit is not None:
+        _DOWNSAMPLE_MEMO.move_to_end(key)
+        heights, first_ts, last_ts, count = hit
+        return list(heights), first_ts, last_ts, count
+
+    points, first_ts, last_ts = _parse_csv(csv_text)
+    if len(points) <= threshold:
+        raise ValueError("Not enough data points to downsample")
+    heights = _downsample_to_heights(points, threshold)
+
+    _DOWNSAMPLE_MEMO[key] = (tuple(heights), first_ts, last_ts, len(points))
+    if len(_DOWNSAMPLE_MEMO) > _DOWNSAMPLE_MEMO_MAX:
+        _DOWNSAMPLE_MEMO.popitem(last=False)
+    return heights, first_ts, last_ts, len(points)
+
+
+def _reading_interval_s(first_ts: datetime, last_ts: datetime, count: int) -> int:
+    """Average time between readings, rounded to the nearest minute.
+
+    EA gauges report on a fixed cadence (usually 15 minutes), so the mean over a
+    few days is a good estimate even with the odd missing reading.
+    """
+    if count < 2:
+        return 0
+    mean_s = (last_ts - first_ts).total_seconds() / (count - 1)
+    return int(round(mean_s / 60.0)) * 60
 
-    out = {
+
+def _next_expected_update(now: datetime, next_readings, schedule_interval_s: int, publish_lag_s: int = 60) -> datetime:
+    """When the published artifacts are next expected to change.
+
+    That is the first scheduled Fletcher run at or after the earliest expected
+    new reading, plus a little lag for the run itself. If a reading is already
+    overdue, the best guess is the next scheduled run.
+    """
+    schedule = timedelta(seconds=schedule_interval_s)
+    runs = 1
+    if next_readings:
+        earliest = min(next_readings)
+        if earliest > now:
+            runs = max(1, math.ceil((earliest - now) / schedule))
+    return now + runs * schedule + timedelta(seconds=publish_lag_s)
+
+
+def build_station_document(station: dict, threshold: int = 200, csv_text: str = None) -> dict:
+    """Fetch, parse and downsample one station into its entry in the river level document.
+
+    csv_text, if given, is the station's already-fetched CSV. Stations with
+    "source": "ea_readings" otherwise fetch only new readings (see ea_readings).
+    """
+    url = station.get("url")
+    if not url:
+        return {
+            **station,
+            "error": "missing url",
+        }
+
+    if csv_text is None and station.get("source") == ea_readings.SOURCE and station.get("readings_url"):
+        points, first_ts, last_ts = ea_readings.station_points(station, _full_readings)
+        if len(points) <= threshold:
+            raise ValueError("Not enough data points to downsample")
+        heights = _downsample_to_heights(points, threshold)
+        count = len(points)
+    else:
+        if csv_text is None:
+            csv_text = _fetch_csv_text(url)
+        heights, first_ts, last_ts, count = _downsample_csv(csv_text, threshold)
+
+    interval_s = _reading_interval_s(first_ts, last_ts, count)
+    next_reading_ts = last_ts + timedelta(seconds=interval_s)
+
+    return {
+        "name": station.get("name"),
+        "url": url,
+        "top_of_normal_range_m": station.get("top_of_normal_range_m"),
+        "highest_ever_recorded_m": station.get("highest_ever_recorded_m"),
+        "y_axis_bottom_m": station.get("y_axis_bottom_m"),
+        "y_axis_top_m": station.get("y_axis_top_m"),
+        "first_timestamp_utc": first_ts.isoformat(),
+        "last_timestamp_utc": last_ts.isoformat(),
+        "reading_interval_s": interval_s,
+        "next_reading_expected_utc": next_reading_ts.isoformat(),
+        "heights_m": heights,
+    }
+
+
+def assemble_document(station_docs, now: datetime, schedule_interval_s: int = 15 * 60) -> dict:
+    """Wrap per-station entries into the river level document, working out the next expected update."""
+    next_readings = [
+        datetime.fromisoformat(s["next_reading_expected_utc"])
+        for s in station_docs
+        if s.get("reading_interval_s") and s.get("next_reading_expected_utc")
+    ]
+    return {
         "utc_time": now.isoformat(),
-        "stations": [],
+        "stations": list(station_docs),
+        "next_expected_update_utc": _next_expected_update(now, next_readings, schedule_interval_s).isoformat(),
     }
 
+
+def build_river_level_document(stations, threshold: int = 200, schedule_interval_s: int = 15 * 60):
+    now = datetime.now(timezone.utc)
+    station_docs = [build_station_document(station, threshold) for station in stations]
+    return assemble_document(station_docs, now, schedule_interval_s)
+
+
+def select_stations(doc: dict, names, schedule_interval_s: int = 15 * 60) -> dict:
+    """A copy of doc with only the named stations, in the order given.
+
+    The next expected update is recomputed from just those stations, since a
+    display showing slow gauges doesn't need to wake for a fast one.
+    """
+    by_name = {s.get("name"): s for s in doc.get("stations", [])}
+    missing = [n for n in names if n not in by_name]
+    if missing:
+        raise ValueError(f"Unknown station(s): {', '.join(missing)}")
+
+    now = datetime.fromisoformat(doc["utc_time"])
+    return assemble_document([by_name[n] for n in names], now, schedule_interval_s)
+
+
+# Rapid-rise detection, for the cheap "watch" path that runs between scheduled renders.
+# Each station's RiseDetector holds O(1) state (the last reading, a smoothed rate of change,
+# whether it has already reported the current rise, and when the river went above
+# top_of_normal_range_m) and is fed only readings newer than the last one it saw, so a
+# watch run costs a fetch and a few comparisons per station.
+
+# Readings are quantized to 1cm, so one 15-minute step is already 0.04 m/h; the rate is an
+# exponentially weighted average over about this long, so single steps don't fire.
+RATE_SMOOTHING_S = 60 * 60
+# Default smoothed rise that counts as rapid (1.2m a day); stations can set "rapid_rise_m_per_h".
+RAPID_RISE_M_PER_H = 0.05
+# Gauges often sit a centimetre either side of the top of the normal range; the river has
+# to fall this far below it to count as back to normal, so that doesn't fire on every reading.
+CROSSING_HYSTERESIS_M = 0.02
+
+_CSV_TS_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+class RiseDetector:
+    """Rolling rate of rise and time above the top of the normal range for one station."""
+
+    def __init__(self, top_of_normal_range_m: float = None, rapid_rise_m_per_h: float = RAPID_RISE_M_PER_H):
+        self.top_of_normal_range_m = top_of_normal_range_m
+        self.rapid_rise_m_per_h = rapid_rise_m_per_h
+        self.last_ts = None
+        self.last_height_m = None
+        self.rate_m_per_h = 0.0
+        self.rising = False
+        self.above_since = None
+
+    def update(self, ts: datetime, height_m: float) -> list:
+        """Add the next reading. Returns the events it causes: "rapid_rise", "above_normal", "below_normal"."""
+        events = []
+        if self.last_ts is not None:
+            dt_s = (ts - self.last_ts).total_seconds()
+            if dt_s <= 0:
+                return events
+            slope_m_per_h = (height_m - self.last_height_m) * 3600.0 / dt_s
+            # Time-weighted, so a gap in readings counts for as long as it lasted.
+            alpha = 1.0 - math.exp(-dt_s / RATE_SMOOTHING_S)
+            self.rate_m_per_h += alpha * (slope_m_per_h - self.rate_m_per_h)
+            # Edge-triggered like the crossings: once per rise, re-armed when it slows.
+            if self.rate_m_per_h >= self.rapid_rise_m_per_h:
+                if not self.rising:
+                    self.rising = True
+                    events.append("rapid_rise")
+            else:
+                self.rising = False
+
+        top = self.top_of_normal_range_m
+        if isinstance(top, (int, float)):
+            if height_m >= top and self.above_since is None:
+                self.above_since = ts
+                if self.last_ts is not None:
+                    events.append("above_normal")
+            elif height_m < top - CROSSING_HYSTERESIS_M and self.above_since is not None:
+                self.above_since = None
+                events.append("below_normal")
+
+        self.last_ts = ts
+        self.last_height_m = height_m
+        return events
+
+    def seconds_above_normal(self, now: datetime):
+        """How long the river has been at or above top_of_normal_range_m, or None if it isn't."""
+        if self.above_since is None:
+            return None
+        return int((now - self.above_since).total_seconds())
+
+    def to_dict(self) -> dict:
+        return {
+            "last_ts": self.last_ts.isoformat() if self.last_ts else None,
+            "last_height_m": self.last_height_m,
+            "rate_m_per_h": self.rate_m_per_h,
+            "rising": self.rising,
+            "above_since": self.above_since.isoformat() if self.above_since else None,
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict, top_of_normal_range_m: float = None, rapid_rise_m_per_h: float = RAPID_RISE_M_PER_H):
+        detector = cls(top_of_normal_range_m, rapid_rise_m_per_h)
+        if state.get("last_ts"):
+            detector.last_ts = datetime.fromisoformat(state["last_ts"])
+            detector.last_height_m = float(state["last_height_m"])
+        detector.rate_m_per_h = float(state.get("rate_m_per_h") or 0.0)
+        detector.rising = bool(state.get("rising"))
+        if state.get("above_since"):
+            detector.above_since = datetime.fromisoformat(state["above_since"])
+        return detector
+
+
+def _readings_after(csv_text: str, after: datetime = None):
+    """(timestamp, height) rows newer than after (all rows if None), oldest first.
+
+    The CSV is in time order, so rows are read back from the end and parsing stops at the
+    first one already seen; the fixed-width UTC timestamps compare correctly as text.
+    """
+    after_text = after.strftime(_CSV_TS_FORMAT) if after is not None else None
+    lines = csv_text.splitlines()
+    readings = []
+    for line in reversed(lines[1:]):
+        ts_text, _, height_text = line.partition(",")
+        if not height_text:
+            continue
+        if after_text is not None and ts_text <= after_text:
+            break
+        ts = datetime.strptime(ts_text, _CSV_TS_FORMAT).replace(tzinfo=timezone.utc)
+        readings.append((ts, float(height_text.split(",")[0])))
+    readings.reverse()
+    return readings
+
+
+def _full_readings(station: dict):
+    return _readings_after(_fetch_csv_text(station["url"]))
+
+
+def _detector_for(station: dict, state: dict = None) -> RiseDetector:
+    top = station.get("top_of_normal_range_m")
+    rapid = station.get("rapid_rise_m_per_h", RAPID_RISE_M_PER_H)
+    if state:
+        return RiseDetector.from_dict(state, top, rapid)
+    return RiseDetector(top, rapid)
+
+
+@stage_timing.timed("watch")
+def watch_stations(stations, states: dict, now: datetime = None) -> dict:
+    """The watch fast path: fetch each station's CSV and feed its new readings to its detector.
+
+    states maps station name to RiseDetector.to_dict() from the previous run. A station
+    without state is seeded from its whole CSV without raising events, since those
+    readings aren't news. Returns {"events": {name: [event, ...]}, "states": {...},
+    "csv_texts": {name: text}, "stations": {name: summary}}; csv_texts lets a full render
+    that the events trigger reuse the fetches.
+    """
+    now = now or datetime.now(timezone.utc)
+    events = {}
+    new_states = {}
+    csv_texts = {}
+    summaries = {}
     for station in stations:
+        name = station.get("name")
         url = station.get("url")
         if not url:
-            out["stations"].append(
-                {
-                    **station,
-                    "error": "missing url",
-                }
-            )
             continue
-
         csv_text = _fetch_csv_text(url)
-        points, first_ts, last_ts = _parse_csv(csv_text)
+        csv_texts[name] = csv_text
 
-        if len(points) <= threshold:
-            raise ValueError("Not enough data points to downsample")
+        state = states.get(name)
+        detector = _detector_for(station, state)
+        station_events = []
+        for ts, height_m in _readings_after(csv_text, detector.last_ts):
+            station_events.extend(detector.update(ts, height_m))
+        if state and station_events:
+            # One of each is enough to trigger a render.
+            events[name] = sorted(set(station_events))
 
-        heights = _downsample_to_heights(points, threshold)
-
-        out_station = {
-            "name": station.get("name"),
-            "url": url,
-            "top_of_normal_range_m": station.get("top_of_normal_range_m"),
-            "highest_ever_recorded_m": station.get("highest_ever_recorded_m"),
-            "y_axis_bottom_m": station.get("y_axis_bottom_m"),
-            "y_axis_top_m": station.get("y_axis_top_m"),
-            "first_timestamp_utc": first_ts.isoformat(),
-            "last_timestamp_utc": last_ts.isoformat(),
-            "heights_m": heights,
+        new_states[name] = detector.to_dict()
+        summaries[name] = {
+            "height_m": detector.last_height_m,
+            "rate_m_per_h": round(detector.rate_m_per_h, 4),
+            "seconds_above_normal": detector.seconds_above_normal(now),
         }
 
-        out["stations"].append(out_station)
-
-    return out
+    return {"events": events, "states": new_states, "csv_texts": csv_texts, "stations": summaries}
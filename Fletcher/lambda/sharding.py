@@ -0,0 +1,97 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import river_data
+
+
+def split_shards(stations, shard_size: int) -> list:
+    """Split the station list into consecutive shards of at most shard_size stations."""
+    if shard_size < 1:
+        raise ValueError("shard_size must be at least 1")
+    return [list(stations[i:i + shard_size]) for i in range(0, len(stations), shard_size)]
+
+
+def handle_shard(event: dict) -> dict:
+    """Worker side: build the per-station documents for one shard.
+
+    event: {"mode": "shard", "stations": [...], "threshold": 200}
+    Returns {"stations": [station document, ...]} in the same order.
+    """
+    threshold = int(event.get("threshold", 200))
+    return {
+        "stations": [river_data.build_station_document(station, threshold) for station in event.get("stations", [])]
+    }
+
+
+def lambda_invoker(function_name: str, lambda_client=None):
+    """Invoke a shard on another (synchronous) invocation of the given Lambda function."""
+    if lambda_client is None:
+        import boto3
+
+        lambda_client = boto3.client("lambda")
+
+    def invoke(payload: dict) -> dict:
+        response = lambda_client.invoke(
+            FunctionName=function_name,
+            InvocationType="RequestResponse",
+            Payload=json.dumps(payload).encode("utf-8"),
+        )
+        body = response["Payload"].read()
+        if response.get("FunctionError"):
+            raise RuntimeError(f"Shard invocation failed: {body[:500]!r}")
+        return json.loads(body)
+
+    return invoke
+
+
+def local_invoker(executor=None):
+    """Offline stand-in for lambda_invoker.
+
+    Runs handle_shard in this process, or on the given executor (e.g. a
+    ProcessPoolExecutor), with the payload and result round-tripped through JSON
+    as they would be through Lambda.
+    """
+
+    def invoke(payload: dict) -> dict:
+        request = json.loads(json.dumps(payload))
+        if executor is None:
+            result = handle_shard(request)
+        else:
+            result = executor.submit(handle_shard, request).result()
+        return json.loads(json.dumps(result))
+
+    return invoke
+
+
+def build_river_level_document_sharded(
+    stations,
+    invoke,
+    threshold: int = 200,
+    schedule_interval_s: int = 15 * 60,
+    shard_size: int = 10,
+    max_concurrency: int = 16,
+) -> dict:
+    """Coordinator side: fan the stations out to workers in shards, then merge the results.
+
+    Produces the same document as river_data.build_river_level_document, with stations
+    in their original order. If any shard fails, the whole build fails.
+    """
+    now = datetime.now(timezone.utc)
+    shards = split_shards(stations, shard_size)
+    payloads = [{"mode": "shard", "stations": shard, "threshold": threshold} for shard in shards]
+
+    if not payloads:
+        return river_data.assemble_document([], now, schedule_interval_s)
+
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(payloads))) as pool:
+        results = list(pool.map(invoke, payloads))
+
+    station_docs = []
+    for shard, result in zip(shards, results):
+        docs = result.get("stations") or []
+        if len(docs) != len(shard):
+            raise ValueError(f"Shard returned {len(docs)} stations, expected {len(shard)}")
+        station_docs.extend(docs)
+
+    return river_data.assemble_document(station_docs, now, schedule_interval_s)
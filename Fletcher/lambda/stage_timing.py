@@ -0,0 +1,124 @@
+import functools
+import json
+import sys
+import threading
+import time
+
+# Off until enable() is called, so library use (tests, batch workers) pays one flag check per stage.
+_enabled = False
+_lock = threading.Lock()
+# Stage name -> [count, total_ms, max_ms] since the last reset().
+_stages = {}
+
+
+def enable(on: bool = True):
+    global _enabled
+    _enabled = on
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    """Forget recorded stages. Call at the start of each invocation, as warm containers keep module state."""
+    with _lock:
+        _stages.clear()
+
+
+def record_ms(name: str, elapsed_ms: float):
+    with _lock:
+        s = _stages.get(name)
+        if s is None:
+            _stages[name] = [1, elapsed_ms, elapsed_ms]
+            return
+        s[0] += 1
+        s[1] += elapsed_ms
+        if elapsed_ms > s[2]:
+            s[2] = elapsed_ms
+
+
+class _Span:
+    def __init__(self, name: str):
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if _enabled:
+            record_ms(self._name, (time.perf_counter() - self._start) * 1000.0)
+        return False
+
+
+def span(name: str) -> _Span:
+    """Time a block: `with stage_timing.span("s3_get"): ...`"""
+    return _Span(name)
+
+
+def timed(name: str):
+    """Decorator form of span(), for stages that are already a function."""
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record_ms(name, (time.perf_counter() - start) * 1000.0)
+
+        return wrapper
+
+    return decorate
+
+
+def timings() -> dict:
+    """Total milliseconds per stage, e.g. {"fetch_csv": 812.4, "render_png": 61.2}.
+
+    Stages nest (each render_* includes its draw_image), so the totals don't sum to the run time.
+    """
+    with _lock:
+        return {name: round(s[1], 2) for name, s in sorted(_stages.items())}
+
+
+def breakdown() -> dict:
+    """Count, total and max milliseconds per stage."""
+    with _lock:
+        return {
+            name: {"count": s[0], "total_ms": round(s[1], 2), "max_ms": round(s[2], 2)}
+            for name, s in sorted(_stages.items())
+        }
+
+
+def emf_record(namespace: str, dimensions: dict) -> dict:
+    """A CloudWatch Embedded Metric Format record of the stage totals.
+
+    Lambda forwards stdout to CloudWatch Logs, which extracts EMF records into metrics,
+    so no CloudWatch client or extra IAM permission is needed.
+    """
+    totals = timings()
+    return {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": namespace,
+                    "Dimensions": [sorted(dimensions)],
+                    "Metrics": [{"Name": f"{name}_ms", "Unit": "Milliseconds"} for name in totals],
+                }
+            ],
+        },
+        **dimensions,
+        **{f"{name}_ms": ms for name, ms in totals.items()},
+    }
+
+
+def emit_emf(namespace: str, dimensions: dict, stream=None):
+    if not _stages:
+        return
+    print(json.dumps(emf_record(namespace, dimensions), separators=(",", ":")), file=stream or sys.stdout, flush=True)
@@ -0,0 +1,279 @@
+"""Long-running local Fletcher for installs without AWS (generate_image.py --serve).
+
+Renders the same artifacts app.handler writes to S3, keeps them in memory, and serves them
+over HTTP on the LAN with the headers Pinky reads from S3: ETag, Last-Modified, Range
+requests, and the x-amz-meta-* frame checksums and next-update time. Every response is
+built from bytes and headers computed once per refresh, so a request is a dict lookup and
+a socket write.
+"""
+
+import hashlib
+import json
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import frame_delta
+import render_image
+
+# Must match Pinky's DOWNLOAD_CHUNK_SIZE for per-chunk checks to be used (as app.py).
+FRAME_CHUNK_SIZE = 4096
+
+# Pinky's URLs end in walking-skeleton/<file>, as the S3 keys do; files are served there and at /<file>.
+URL_PREFIX = "/walking-skeleton/"
+
+
+class Artifact:
+    """One file's bytes and the response headers that go with them."""
+
+    __slots__ = ("body", "etag", "last_modified", "modified_epoch", "headers")
+
+    def __init__(self, body: bytes, content_type: str, modified_epoch: float, metadata: dict = None):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.modified_epoch = int(modified_epoch)
+        self.last_modified = formatdate(self.modified_epoch, usegmt=True)
+        self.headers = [
+            ("Content-Type", content_type),
+            ("ETag", self.etag),
+            ("Last-Modified", self.last_modified),
+            ("Cache-Control", "no-cache"),
+            ("Accept-Ranges", "bytes"),
+        ] + [(f"x-amz-meta-{k}", v) for k, v in (metadata or {}).items()]
+
+
+def _next_update_epoch(doc: dict) -> str:
+    return str(int(datetime.fromisoformat(doc["next_expected_update_utc"]).timestamp()))
+
+
+def _frame_metadata(frame_bytes: bytes, next_update_epoch: str) -> dict:
+    # Same metadata app.py stores on latest.bin / latest_3c.bin in S3.
+    return {
+        "frame-crc32": render_image.frame_crc32(frame_bytes),
+        "next-update-epoch": next_update_epoch,
+        "chunk-size": str(FRAME_CHUNK_SIZE),
+        "chunk-crc32": render_image.chunk_crc32s(frame_bytes, FRAME_CHUNK_SIZE),
+    }
+
+
+def build_artifacts(payload: dict, previous: dict, now: float) -> dict:
+    """Render payload into {filename: Artifact}. previous is the last set, for deltas.
+
+    A file whose bytes haven't changed keeps its Last-Modified (and, being content-hashed,
+    its ETag), so devices polling it see it as unchanged.
+    """
+    next_update_epoch = _next_update_epoch(payload)
+    bin_bytes = render_image.render_latest_mono_hlsb_black(payload)
+    bin_3c_bytes = render_image.render_latest_3color_bin(payload)
+
+    files = {
+        "latest.json": (json.dumps(payload, separators=(",", ":")).encode("utf-8"), "application/json", None),
+        "latest.png": (render_image.render_latest_png(payload), "image/png", None),
+        "latest.bin": (bin_bytes, "application/octet-stream", _frame_metadata(bin_bytes, next_update_epoch)),
+        "latest_3c.png": (render_image.render_latest_3color_png(payload), "image/png", None),
+        "latest_3c.bin": (bin_3c_bytes, "application/octet-stream", _frame_metadata(bin_3c_bytes, next_update_epoch)),
+    }
+
+    artifacts = {}
+    for name, (body, content_type, metadata) in files.items():
+        prev = previous.get(name)
+        modified = prev.modified_epoch if prev is not None and prev.body == body else now
+        artifacts[name] = Artifact(body, content_type, modified, metadata)
+
+    for name, frame_name, planes in (("latest.delta", "latest.bin", 1), ("latest_3c.delta", "latest_3c.bin", 2)):
+        prev_frame = previous.get(frame_name)
+        new_bytes = artifacts[frame_name].body
+        if prev_frame is None:
+            continue
+        if prev_frame.body == new_bytes:
+            # Frame unchanged: the last delta, if any, still leads to it.
+            if name in previous:
+                artifacts[name] = previous[name]
+            continue
+        delta = frame_delta.encode_delta(prev_frame.body, new_bytes, planes)
+        if delta is not None:
+            artifacts[name] = Artifact(
+                delta, "application/octet-stream", now, {"frame-crc32": render_image.frame_crc32(new_bytes)}
+            )
+    return artifacts
+
+
+class ArtifactStore:
+    """The current artifact set. Refreshes swap in a whole new dict, so readers never see a mix."""
+
+    def __init__(self):
+        self._artifacts = {}
+
+    def get(self, name: str):
+        return self._artifacts.get(name)
+
+    def all(self) -> dict:
+        return self._artifacts
+
+    def replace(self, artifacts: dict):
+        self._artifacts = artifacts
+
+
+class Refresher:
+    """Rebuild the artifacts every interval_s seconds on a background thread.
+
+    A failed refresh is logged and the previous artifacts keep being served.
+    """
+
+    def __init__(self, store: ArtifactStore, build_payload, interval_s: float):
+        self._store = store
+        self._build_payload = build_payload
+        self._interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="fletcher-refresh", daemon=True)
+
+    def refresh(self) -> bool:
+        start = time.perf_counter()
+        try:
+            payload = self._build_payload()
+            self._store.replace(build_artifacts(payload, self._store.all(), time.time()))
+        except Exception:
+            traceback.print_exc()
+            return False
+        print(f"refreshed in {(time.perf_counter() - start) * 1000.0:.0f}ms", file=sys.stderr, flush=True)
+        return True
+
+    def start(self) -> "Refresher":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self._interval_s):
+            self.refresh()
+
+
+def _parse_range(value: str, size: int):
+    """(start, end) inclusive for a single "bytes=a-b" / "bytes=a-" / "bytes=-n" range, or None."""
+    if not value.startswith("bytes=") or "," in value:
+        return None
+    first, _, last = value[len("bytes="):].strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            start = max(size - int(last), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        return None
+    return start, min(end, size - 1)
+
+
+def _not_modified(artifact: Artifact, headers) -> bool:
+    if_none_match = headers.get("If-None-Match")
+    if if_none_match is not None:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        return "*" in tags or artifact.etag in tags or f"W/{artifact.etag}" in tags
+    if_modified_since = headers.get("If-Modified-Since")
+    if if_modified_since:
+        try:
+            return artifact.modified_epoch <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "Fletcher"
+    # Headers and body go out as separate writes; without TCP_NODELAY, keep-alive clients
+    # wait on Nagle plus delayed ACK (~40ms) for each body.
+    disable_nagle_algorithm = True
+    store = None
+
+    def _artifact(self):
+        path = self.path.split("?", 1)[0]
+        if path.startswith(URL_PREFIX):
+            name = path[len(URL_PREFIX):]
+        else:
+            name = path.lstrip("/")
+        return self.store.get(name)
+
+    def _respond(self, head_only: bool):
+        artifact = self._artifact()
+        if artifact is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if _not_modified(artifact, self.headers):
+            self.send_response(304)
+            self.send_header("ETag", artifact.etag)
+            self.send_header("Last-Modified", artifact.last_modified)
+            self.end_headers()
+            return
+
+        body = artifact.body
+        status = 200
+        content_range = None
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if range_header and (if_range is None or if_range in (artifact.etag, artifact.last_modified)):
+            byte_range = _parse_range(range_header, len(body))
+            if byte_range is None:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            start, end = byte_range
+            status = 206
+            content_range = f"bytes {start}-{end}/{len(body)}"
+            body = memoryview(body)[start:end + 1]
+
+        self.send_response(status)
+        for key, value in artifact.headers:
+            self.send_header(key, value)
+        if content_range is not None:
+            self.send_header("Content-Range", content_range)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond(head_only=False)
+
+    def do_HEAD(self):
+        self._respond(head_only=True)
+
+    def log_request(self, code="-", size="-"):
+        # One line per device poll is noise; errors still go through log_error.
+        pass
+
+
+def serve(build_payload, host: str = "0.0.0.0", port: int = 8080, interval_s: float = 15 * 60) -> int:
+    """Render once, then serve the artifacts and re-render every interval_s seconds until interrupted."""
+    store = ArtifactStore()
+    refresher = Refresher(store, build_payload, interval_s)
+    if not refresher.refresh():
+        print("initial render failed; serving 404s until the next refresh", file=sys.stderr)
+    refresher.start()
+
+    handler = type("FletcherHandler", (_Handler,), {"store": store})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    print(f"serving on http://{host}:{server.server_address[1]}{URL_PREFIX}", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        refresher.stop()
+        server.server_close()
+    return 0
@@ -0,0 +1,61 @@
+import binascii
+import struct
+
+# Mirrors Fletcher/lambda/frame_delta.py. All integers big-endian:
+#   header: magic b"FDL1", base_crc32 (u32), new_crc32 (u32), planes (u8), rect_count (u16)
+#   per rect: x_byte, y, width_bytes, height (u16 each),
+#             then `planes` blocks of width_bytes * height bytes (black plane first, then red).
+MAGIC = b"FDL1"
+HEADER_FORMAT = ">4sIIBH"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+RECT_FORMAT = ">HHHH"
+RECT_SIZE = struct.calcsize(RECT_FORMAT)
+
+WIDTH_BYTES = 400 // 8
+
+
+def planes_crc(black, red, planes: int) -> int:
+    """CRC32 of the framebuffer planes, matching Fletcher's CRC of latest.bin / latest_3c.bin."""
+    crc = binascii.crc32(black)
+    if planes == 2:
+        crc = binascii.crc32(red, crc)
+    return crc & 0xFFFFFFFF
+
+
+def apply_delta(delta, black, red, expected_crc: int = 0, width_bytes: int = WIDTH_BYTES) -> tuple:
+    """Patch black/red framebuffers in place from a delta.
+    
+    Raises ValueError if the delta is malformed, isn't based on what's in the buffers,
+    doesn't lead to expected_crc (if given), or doesn't produce the frame it claims to. The buffers may be partly patched on error,
+    so callers should fall back to a full download.
+    Returns (new_crc: int, rects: list of (x_byte, y, width_bytes, height))
+    """
+    if len(delta) < HEADER_SIZE:
+        raise ValueError("Delta too short")
+    magic, base_crc, new_crc, planes, rect_count = struct.unpack_from(HEADER_FORMAT, delta, 0)
+    if magic != MAGIC or planes not in (1, 2):
+        raise ValueError("Not a frame delta")
+    if expected_crc and new_crc != expected_crc:
+        raise ValueError("Delta is not for the latest frame")
+    if planes_crc(black, red, planes) != base_crc:
+        raise ValueError("Delta base does not match frame on screen")
+
+    planes_buf = (black, red)
+    rects = []
+    off = HEADER_SIZE
+    for _ in range(rect_count):
+        x_byte, y, w, h = struct.unpack_from(RECT_FORMAT, delta, off)
+        off += RECT_SIZE
+        if off + planes * w * h > len(delta):
+            raise ValueError("Delta truncated")
+        for p in range(planes):
+            buf = planes_buf[p]
+            for row in range(y, y + h):
+                start = row * width_bytes + x_byte
+                buf[start:start + w] = delta[off:off + w]
+                off += w
+        rects.append((x_byte, y, w, h))
+
+    if planes_crc(black, red, planes) != new_crc:
+        raise ValueError("Delta result CRC mismatch")
+    return (new_crc, rects)
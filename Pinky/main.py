@@ -1,38 +1,260 @@
+import binascii
+
 import utime
 
 import config
+import pinky_metrics
+import pinky_state
 from pinky_display import PinkyDisplay
+from waveshare_epd_4in2b import BusyTimeout
 from wifi_helper import connect_wifi, disconnect_wifi
 
 
-def _check_if_updated(url: str, last_modified: str) -> tuple:
+def _get_header(headers, name: str) -> str:
+    value = headers.get(name)
+    if value is None:
+        value = headers.get(name.lower(), "")
+    return value
+
+
+def _parse_frame_crc(value: str) -> int:
+    try:
+        return int(value, 16) if value else 0
+    except ValueError:
+        return 0
+
+
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def _parse_http_date(value: str) -> int:
+    """Parse an HTTP Date header (e.g. "Wed, 21 Oct 2015 07:28:00 GMT") to Unix epoch seconds.
+    
+    Done by hand rather than with utime.mktime, whose epoch differs between ports.
+    Returns 0 if the value can't be parsed.
+    """
+    try:
+        parts = value.split()
+        day = int(parts[1])
+        month = _MONTHS.index(parts[2]) + 1
+        year = int(parts[3])
+        hh, mm, ss = [int(p) for p in parts[4].split(":")]
+    except Exception:
+        return 0
+    
+    # Days since 1970-01-01 (civil calendar, Howard Hinnant's algorithm).
+    y = year - 1 if month <= 2 else year
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    days = era * 146097 + doe - 719468
+    return days * 86400 + hh * 3600 + mm * 60 + ss
+
+
+def _next_check_s(headers) -> int:
+    """Seconds until Fletcher expects the frame to change, from its x-amz-meta-next-update-epoch
+    header and the response Date header. Returns 0 if unknown or already in the past.
+    """
+    try:
+        next_update = int(_get_header(headers, "X-Amz-Meta-Next-Update-Epoch") or 0)
+    except ValueError:
+        return 0
+    now = _parse_http_date(_get_header(headers, "Date"))
+    if not next_update or not now or next_update <= now:
+        return 0
+    return next_update - now
+
+
+def _check_if_updated(url: str, last_modified: str, frame_crc: int = 0) -> tuple:
     """Check if URL has been modified since last_modified timestamp using HTTP HEAD.
     
-    Returns (has_changed: bool, new_timestamp: str)
+    If Fletcher published a frame digest (x-amz-meta-frame-crc32) that matches
+    frame_crc, the frame on screen is already up to date even if Last-Modified moved.
+    
+    Returns (has_changed: bool, new_timestamp: str, next_check_s: int, current_crc: int)
     """
     import urequests
     
     try:
-        resp = urequests.head(url)
+        with pinky_metrics.span("http_head"):
+            resp = urequests.head(url)
         try:
             status = getattr(resp, "status_code", 0)
             if status != 200:
-                return (True, "")
+                return (True, "", 0, 0)
             
             headers = getattr(resp, "headers", {})
-            current_modified = headers.get("Last-Modified", headers.get("last-modified", ""))
+            current_modified = _get_header(headers, "Last-Modified")
+            current_crc = _parse_frame_crc(_get_header(headers, "X-Amz-Meta-Frame-Crc32"))
+            next_check_s = _next_check_s(headers)
+            
+            if frame_crc and current_crc == frame_crc:
+                return (False, current_modified, next_check_s, current_crc)
             
             if not current_modified or not last_modified:
-                return (True, current_modified)
+                return (True, current_modified, next_check_s, current_crc)
             
-            return (current_modified != last_modified, current_modified)
+            return (current_modified != last_modified, current_modified, next_check_s, current_crc)
         finally:
             try:
                 resp.close()
             except Exception:
                 pass
     except Exception:
-        return (True, "")
+        return (True, "", 0, 0)
+
+
+def _download_whole(url: str, debug_log: list) -> tuple:
+    """Fetch url with a single GET. Returns (data: bytes, headers: dict)"""
+    import urequests
+    
+    with pinky_metrics.span("http_get"):
+        resp = urequests.get(url)
+    try:
+        status = getattr(resp, "status_code", 200)
+        debug_log.append("HTTP {}".format(status))
+        if status != 200:
+            raise ValueError("HTTP status {}".format(status))
+        with pinky_metrics.span("download"):
+            data = resp.content
+        pinky_metrics.count("download_bytes", len(data))
+        debug_log.append("Got {} bytes".format(len(data)))
+        return (data, getattr(resp, "headers", {}))
+    finally:
+        try:
+            resp.close()
+        except Exception:
+            pass
+
+
+def _content_range_total(headers) -> int:
+    # "bytes 0-4095/30000"
+    value = _get_header(headers, "Content-Range")
+    try:
+        return int(value.split("/")[1])
+    except Exception:
+        raise ValueError("Bad Content-Range: {}".format(value))
+
+
+def _chunk_crcs(headers, chunk_size: int):
+    """Per-chunk CRC32s Fletcher publishes (x-amz-meta-chunk-crc32), if they match our chunk size."""
+    try:
+        published_size = int(_get_header(headers, "X-Amz-Meta-Chunk-Size") or 0)
+    except ValueError:
+        return None
+    if published_size != chunk_size:
+        return None
+    value = _get_header(headers, "X-Amz-Meta-Chunk-Crc32")
+    if not value:
+        return None
+    return [_parse_frame_crc(v) for v in value.split(",")]
+
+
+def _read_into(resp, mv):
+    """Read exactly len(mv) body bytes from resp straight into mv."""
+    raw = getattr(resp, "raw", None)
+    if raw is not None and hasattr(raw, "readinto"):
+        got = 0
+        while got < len(mv):
+            n = raw.readinto(mv[got:])
+            if not n:
+                raise OSError("Connection closed after {} bytes".format(got))
+            got += n
+        return
+    data = resp.content
+    if len(data) != len(mv):
+        raise ValueError("Expected {} bytes, got {}".format(len(mv), len(data)))
+    mv[:] = data
+
+
+def _download_ranged(url: str, chunk_size: int, debug_log: list, ssid: str, password: str) -> tuple:
+    """Fetch url in Range: chunks into one preallocated buffer, resuming after failures.
+    
+    Each chunk is checked against Fletcher's per-chunk CRC32 when published. If a chunk
+    fails (e.g. WiFi drops), WiFi is reconnected and the download resumes from that chunk,
+    up to DOWNLOAD_MAX_RETRIES times. If the object changes mid-download (ETag or
+    Last-Modified moves), it starts again from the beginning.
+    Returns (data: bytearray, headers: dict)
+    """
+    import urequests
+    
+    max_retries = getattr(config, "DOWNLOAD_MAX_RETRIES", 3)
+    retries = 0
+    buf = None
+    mv = None
+    total = 0
+    offset = 0
+    validator = None
+    crcs = None
+    first_headers = {}
+    
+    while buf is None or offset < total:
+        try:
+            with pinky_metrics.span("http_get"):
+                resp = urequests.get(url, headers={"Range": "bytes={}-{}".format(offset, offset + chunk_size - 1)})
+            try:
+                status = getattr(resp, "status_code", 200)
+                if status == 200:
+                    # Server ignored Range: take the whole body in one go.
+                    debug_log.append("HTTP 200 (no ranges)")
+                    with pinky_metrics.span("download"):
+                        data = resp.content
+                    pinky_metrics.count("download_bytes", len(data))
+                    debug_log.append("Got {} bytes".format(len(data)))
+                    return (data, getattr(resp, "headers", {}))
+                if status != 206:
+                    raise ValueError("HTTP status {}".format(status))
+                
+                headers = getattr(resp, "headers", {})
+                this_validator = _get_header(headers, "ETag") or _get_header(headers, "Last-Modified")
+                if buf is not None and this_validator != validator:
+                    debug_log.append("Changed mid-download, restarting")
+                    buf = None
+                    offset = 0
+                    continue
+                if buf is None:
+                    validator = this_validator
+                    total = _content_range_total(headers)
+                    buf = bytearray(total)
+                    mv = memoryview(buf)
+                    crcs = _chunk_crcs(headers, chunk_size)
+                    first_headers = headers
+                
+                n = min(chunk_size, total - offset)
+                with pinky_metrics.span("download"):
+                    _read_into(resp, mv[offset:offset + n])
+                pinky_metrics.count("download_bytes", n)
+            finally:
+                try:
+                    resp.close()
+                except Exception:
+                    pass
+            
+            if crcs is not None:
+                index = offset // chunk_size
+                if index >= len(crcs) or _frame_checksum(mv[offset:offset + n]) != crcs[index]:
+                    raise ValueError("Chunk {} CRC mismatch".format(index))
+            offset += n
+        except Exception as e:
+            retries += 1
+            pinky_metrics.count("download_retries")
+            debug_log.append("Chunk @{}: {}: {}".format(offset, type(e).__name__, str(e)))
+            if retries > max_retries:
+                raise
+            try:
+                disconnect_wifi()
+            except Exception:
+                pass
+            if not connect_wifi(ssid, password):
+                raise RuntimeError("Failed to reconnect to WiFi")
+    
+    frame_crc = _parse_frame_crc(_get_header(first_headers, "X-Amz-Meta-Frame-Crc32"))
+    if frame_crc and _frame_checksum(buf) != frame_crc:
+        raise ValueError("Frame CRC mismatch")
+    
+    debug_log.append("Got {} bytes ({} retries)".format(total, retries))
+    return (buf, first_headers)
 
 
 def _load_framebuffer_bytes(debug_log: list) -> bytes:
@@ -51,7 +273,6 @@ def _load_framebuffer_bytes(debug_log: list) -> bytes:
 
     if source == "wifi":
         import secrets
-        import urequests
         
         ssid = getattr(secrets, "WIFI_SSID", "")
         if not ssid:
@@ -83,24 +304,14 @@ def _load_framebuffer_bytes(debug_log: list) -> bytes:
             debug_log.append("URL: {}".format(url))
             
             debug_log.append("Fetching...")
-            resp = urequests.get(url)
-            try:
-                status = getattr(resp, "status_code", 200)
-                debug_log.append("HTTP {}".format(status))
-                if status != 200:
-                    raise ValueError("HTTP status {}".format(status))
-                data = resp.content
-                debug_log.append("Got {} bytes".format(len(data)))
-                
-                headers = getattr(resp, "headers", {})
-                last_modified = headers.get("Last-Modified", headers.get("last-modified", ""))
-                
-                return (data, last_modified)
-            finally:
-                try:
-                    resp.close()
-                except Exception:
-                    pass
+            chunk_size = getattr(config, "DOWNLOAD_CHUNK_SIZE", 4096)
+            if chunk_size:
+                data, headers = _download_ranged(url, chunk_size, debug_log, ssid, password)
+            else:
+                data, headers = _download_whole(url, debug_log)
+            
+            last_modified = _get_header(headers, "Last-Modified")
+            return (data, last_modified, _next_check_s(headers))
         finally:
             debug_log.append("Disconnecting...")
             disconnect_wifi()
@@ -109,12 +320,94 @@ def _load_framebuffer_bytes(debug_log: list) -> bytes:
     raise ValueError("Unknown FRAMEBUFFER_SOURCE")
 
 
-def _run_once(display: PinkyDisplay, last_modified: str, show_debug: bool = True) -> tuple:
+def _try_partial_update(display: PinkyDisplay, state: dict, expected_crc: int, debug_log: list) -> bool:
+    """Fetch Fletcher's frame delta and refresh only the changed windows of the panel.
+    
+    Only used on the newer (SSD1683) controller, when the buffers still hold the frame on
+    screen (drawn earlier in this boot, so never straight after a deep sleep), and when the delta leads to the frame Fletcher is advertising (expected_crc).
+    Every FULL_REFRESH_EVERY partial updates a full refresh is forced to clear ghosting.
+    Returns True if the panel was updated.
+    """
+    if not getattr(config, "PARTIAL_REFRESH", False) or not display.supports_partial():
+        return False
+    if not expected_crc or not state.get("frame_crc") or display.frame_crc != state["frame_crc"]:
+        return False
+    if state.get("partial_refreshes", 0) >= getattr(config, "FULL_REFRESH_EVERY", 10):
+        debug_log.append("Partial: full refresh due")
+        return False
+    
+    if getattr(config, "USE_3COLOR", False):
+        url = getattr(config, "FLETCHER_LATEST_3C_DELTA_URL", "")
+    else:
+        url = getattr(config, "FLETCHER_LATEST_DELTA_URL", "")
+    if not url:
+        return False
+    
+    import urequests
+    
+    try:
+        with pinky_metrics.span("http_get"):
+            resp = urequests.get(url)
+        try:
+            status = getattr(resp, "status_code", 200)
+            if status != 200:
+                debug_log.append("Partial: HTTP {}".format(status))
+                return False
+            with pinky_metrics.span("download"):
+                delta = resp.content
+            pinky_metrics.count("download_bytes", len(delta))
+        finally:
+            try:
+                resp.close()
+            except Exception:
+                pass
+        
+        new_crc, rects = display.apply_delta(delta, expected_crc)
+    except Exception as e:
+        debug_log.append("Partial exception: {}: {}".format(type(e).__name__, str(e)))
+        return False
+    
+    debug_log.append("Partial: {} bytes, {} windows".format(len(delta), len(rects)))
+    display.show_windows(rects)
+    display.frame_crc = new_crc
+    pinky_metrics.count("partial_refreshes")
+    state["frame_crc"] = new_crc
+    state["partial_refreshes"] = state.get("partial_refreshes", 0) + 1
+    state["updates"] = state.get("updates", 0) + 1
+    return True
+
+
+def _frame_checksum(data: bytes) -> int:
+    return binascii.crc32(data) & 0xFFFFFFFF
+
+
+def _run_once(display: PinkyDisplay, state: dict, show_debug: bool = True) -> bool:
     """Run one fetch/display cycle.
     
-    Returns (success: bool, new_last_modified: str)
+    Updates state["last_modified"] and state["frame_crc"] when a new frame is shown,
+    and state["next_check_s"] with Fletcher's hint for when to check again (0 if unknown).
+    If the panel stops responding the cycle fails, and the next one does a full refresh.
+    Returns success: bool
     """
     debug_log = []
+    try:
+        return _fetch_and_show(display, state, show_debug, debug_log)
+    except BusyTimeout as e:
+        debug_log.append("Panel: {}".format(str(e)))
+        # Nothing can be drawn on a stuck panel; the serial console is the only place to report it.
+        for line in debug_log:
+            print(line)
+        pinky_metrics.count("busy_timeouts")
+        # What's on the panel is unknown now.
+        display.frame_crc = 0
+        state["frame_crc"] = 0
+        state["partial_refreshes"] = 0
+        return False
+
+
+def _fetch_and_show(display: PinkyDisplay, state: dict, show_debug: bool, debug_log: list) -> bool:
+    last_modified = state.get("last_modified", "")
+    state["next_check_s"] = 0
     error_msg = None
     framebuffer_data = None
     new_last_modified = last_modified
@@ -147,7 +440,8 @@ def _run_once(display: PinkyDisplay, last_modified: str, show_debug: bool = True
                     if connected:
                         try:
                             try:
-                                has_changed, new_timestamp = _check_if_updated(url, last_modified)
+                                has_changed, new_timestamp, next_check_s, current_crc = _check_if_updated(url, last_modified, state.get("frame_crc", 0))
+                                state["next_check_s"] = next_check_s
                                 debug_log.append("HEAD: changed={}".format(has_changed))
                                 if new_timestamp:
                                     debug_log.append("HEAD: Last-Modified present")
@@ -157,9 +451,15 @@ def _run_once(display: PinkyDisplay, last_modified: str, show_debug: bool = True
 	
                             if not has_changed:
                                 debug_log.append("No update")
-                                return (True, last_modified)
+                                if new_timestamp:
+                                    state["last_modified"] = new_timestamp
+                                return True
                             if new_timestamp:
                                 new_last_modified = new_timestamp
+                            
+                            if not show_debug and _try_partial_update(display, state, current_crc, debug_log):
+                                state["last_modified"] = new_last_modified
+                                return True
                         finally:
                             try:
                                 disconnect_wifi()
@@ -167,6 +467,8 @@ def _run_once(display: PinkyDisplay, last_modified: str, show_debug: bool = True
                                 debug_log.append("WiFi disconnect exception: {}: {}".format(type(e).__name__, str(e)))
                     else:
                         debug_log.append("WiFi: connect failed")
+                except BusyTimeout:
+                    raise
                 except Exception as e:
                     debug_log.append("Update-check exception: {}: {}".format(type(e).__name__, str(e)))
 	    
@@ -176,9 +478,10 @@ def _run_once(display: PinkyDisplay, last_modified: str, show_debug: bool = True
     try:
         result = _load_framebuffer_bytes(debug_log)
         if source == "wifi" and isinstance(result, tuple):
-            framebuffer_data, timestamp = result
+            framebuffer_data, timestamp, next_check_s = result
             if timestamp:
                 new_last_modified = timestamp
+            state["next_check_s"] = next_check_s
         else:
             framebuffer_data = result
         debug_log.append("")
@@ -196,9 +499,17 @@ def _run_once(display: PinkyDisplay, last_modified: str, show_debug: bool = True
             display.text_black(line, 5, y)
             y += 10
         display.show()
-        return (False, last_modified)
+        state["frame_crc"] = 0
+        return False
     
     if framebuffer_data is not None:
+        frame_crc = _frame_checksum(framebuffer_data)
+        if not show_debug and frame_crc == state.get("frame_crc", 0):
+            # Same pixels as already on the panel: skip the ~15s refresh.
+            pinky_metrics.count("refreshes_skipped")
+            state["last_modified"] = new_last_modified
+            return True
+        
         if show_debug:
             display.clear()
             y = 5
@@ -215,36 +526,205 @@ def _run_once(display: PinkyDisplay, last_modified: str, show_debug: bool = True
         else:
             display.set_black_framebuffer_bytes(framebuffer_data)
         display.show()
-        return (True, new_last_modified)
+        display.frame_crc = frame_crc
+        pinky_metrics.count("full_refreshes")
+        state["last_modified"] = new_last_modified
+        state["frame_crc"] = frame_crc
+        state["partial_refreshes"] = 0
+        state["updates"] = state.get("updates", 0) + 1
+        return True
     
-    return (False, last_modified)
+    return False
 
 
-def main():
-    display = PinkyDisplay()
+def _sleep_panel(display: PinkyDisplay):
+    """display.sleep(), tolerating a panel that has stopped responding."""
+    try:
+        display.sleep()
+    except BusyTimeout:
+        pinky_metrics.count("busy_timeouts")
+
+
+def _wake_panel(display: PinkyDisplay):
+    try:
+        display.wake()
+    except BusyTimeout:
+        # Still stuck; the next cycle's refresh times out and is retried in turn.
+        pinky_metrics.count("busy_timeouts")
+
+
+def _sleep_between_cycles(display: PinkyDisplay, sleep_ms: int):
+    """Put the panel and the Pico into low-power sleep until the next cycle.
+    
+    "deep" does not return: the Pico resets on wake and main.py runs again,
+    picking up where it left off from the state file. "light" keeps RAM and
+    returns here, so the panel is re-initialised before the next cycle.
+    """
+    import machine
+    
+    _sleep_panel(display)
+    mode = str(getattr(config, "LOW_POWER_SLEEP", "deep")).strip().lower()
+    if mode == "deep":
+        machine.deepsleep(sleep_ms)
+    machine.lightsleep(sleep_ms)
+    _wake_panel(display)
+
+
+def _upload_metrics(url: str):
+    """POST the metrics summary to Fletcher. Best effort: failures are only counted."""
+    import secrets
+    import urequests
+    
+    ssid = getattr(secrets, "WIFI_SSID", "")
+    password = getattr(secrets, "WIFI_PASSWORD", "")
+    if not ssid or not password:
+        return
+    
+    body = pinky_metrics.summary()
+    body["device_id"] = getattr(config, "DEVICE_ID", "pinky")
+    try:
+        if not connect_wifi(ssid, password):
+            return
+        try:
+            resp = urequests.post(
+                url,
+                json=body,
+                headers={"X-Pinky-Token": getattr(secrets, "METRICS_UPLOAD_TOKEN", "")},
+            )
+            resp.close()
+        finally:
+            disconnect_wifi()
+    except Exception:
+        pinky_metrics.count("metrics_upload_failed")
+
+
+def _end_metrics_cycle(cycles: int, always_flush: bool = False):
+    """Close this cycle's metrics, and every METRICS_FLUSH_EVERY cycles write them to flash
+    and, if METRICS_UPLOAD_URL is set, upload a summary."""
+    if not getattr(config, "METRICS_ENABLED", False):
+        return
+    pinky_metrics.end_cycle()
+    flush_every = getattr(config, "METRICS_FLUSH_EVERY", 12)
+    due = flush_every and cycles % flush_every == 0
+    if due or always_flush:
+        pinky_metrics.flush(getattr(config, "METRICS_FILENAME", pinky_metrics.DEFAULT_METRICS_FILENAME))
+    url = getattr(config, "METRICS_UPLOAD_URL", "")
+    if due and url:
+        _upload_metrics(url)
+
+
+def _next_sleep_ms(state: dict, check_interval_s: int) -> int:
+    """How long to sleep before the next check.
+    
+    With SCHEDULE_FOLLOW_FLETCHER, wake shortly after Fletcher expects to publish new
+    data, clamped to SCHEDULE_MIN_INTERVAL_S..SCHEDULE_MAX_INTERVAL_S. Otherwise, or
+    if Fletcher gave no hint, use the fixed check_interval_s.
+    """
+    interval_s = check_interval_s
+    next_check_s = state.get("next_check_s", 0)
+    if getattr(config, "SCHEDULE_FOLLOW_FLETCHER", False) and next_check_s:
+        min_s = getattr(config, "SCHEDULE_MIN_INTERVAL_S", 60)
+        max_s = getattr(config, "SCHEDULE_MAX_INTERVAL_S", 30 * 60)
+        interval_s = min(max(next_check_s, min_s), max_s)
+    return interval_s * 1000
+
+
+def _record_cycle(state: dict, success: bool, check_interval_s: int) -> int:
+    """Count a finished cycle and return how long to sleep before the next one (ms).
+    
+    A failed cycle (no WiFi, an HTTP error, a stuck panel) is retried rather than
+    ending the loop: after check_interval_s, doubling with each failure in a row up to
+    FAILURE_BACKOFF_MAX_S, so a device left without WiFi doesn't flatten its battery
+    trying every few minutes.
+    """
+    state["cycles"] = state.get("cycles", 0) + 1
+    if success:
+        state["failure_streak"] = 0
+        sleep_ms = _next_sleep_ms(state, check_interval_s)
+        pinky_metrics.count("sleep_ms", sleep_ms)
+        return sleep_ms
+    
+    state["failures"] = state.get("failures", 0) + 1
+    state["failure_streak"] = state.get("failure_streak", 0) + 1
+    max_s = max(check_interval_s, getattr(config, "FAILURE_BACKOFF_MAX_S", 60 * 60))
+    # Capping the exponent keeps the arithmetic small on long outages.
+    backoff_s = check_interval_s * (1 << min(state["failure_streak"] - 1, 16))
+    return min(backoff_s, max_s) * 1000
+
+
+def _main_low_power(check_interval_s: int):
+    state_filename = getattr(config, "STATE_FILENAME", pinky_state.DEFAULT_STATE_FILENAME)
+    state = pinky_state.load_state(state_filename)
+    # Deep sleep loses RAM, so the metrics ring has to go to flash every cycle.
+    deep_sleep = str(getattr(config, "LOW_POWER_SLEEP", "deep")).strip().lower() == "deep"
+    
+    # A frame checksum on flash means the panel is already showing a frame
+    # (e-ink keeps its image without power), so don't clear it or show debug.
+    first_run = not state.get("frame_crc")
+    try:
+        display = PinkyDisplay(clear_panel=first_run, busy_wait=getattr(config, "EPD_BUSY_WAIT", "irq"))
+    except BusyTimeout:
+        # The panel didn't come up: count it and try again after a sleep rather than
+        # staying awake at the REPL.
+        import machine
+        
+        sleep_ms = _record_cycle(state, False, check_interval_s)
+        pinky_state.save_state(state, state_filename)
+        machine.deepsleep(sleep_ms)
     display.clear()
     
+    while True:
+        success = _run_once(display, state, show_debug=first_run)
+        first_run = False
+        
+        sleep_ms = _record_cycle(state, success, check_interval_s)
+        pinky_state.save_state(state, state_filename)
+        _end_metrics_cycle(state["cycles"], always_flush=deep_sleep)
+        
+        _sleep_between_cycles(display, sleep_ms)
+
+
+def main():
     scheduled_mode = getattr(config, "SCHEDULED_MODE", False)
     check_interval_s = getattr(config, "SCHEDULE_CHECK_INTERVAL_S", 5 * 60)
     
-    last_modified = ""
+    if getattr(config, "METRICS_ENABLED", False):
+        pinky_metrics.load(
+            getattr(config, "METRICS_FILENAME", pinky_metrics.DEFAULT_METRICS_FILENAME),
+            getattr(config, "METRICS_RING_SIZE", pinky_metrics.DEFAULT_RING_SIZE),
+        )
+    
+    if scheduled_mode and getattr(config, "LOW_POWER_MODE", False):
+        _main_low_power(check_interval_s)
+        return
+    
+    display = PinkyDisplay(busy_wait=getattr(config, "EPD_BUSY_WAIT", "irq"))
+    display.clear()
+    
+    state = pinky_state.default_state()
     
     if not scheduled_mode:
-        _run_once(display, last_modified, show_debug=True)
+        _run_once(display, state, show_debug=True)
         utime.sleep_ms(20000)
-        display.sleep()
+        _sleep_panel(display)
         return
     
     first_run = True
     while True:
-        success, last_modified = _run_once(display, last_modified, show_debug=first_run)
+        success = _run_once(display, state, show_debug=first_run)
         first_run = False
         
+        sleep_ms = _record_cycle(state, success, check_interval_s)
+        _end_metrics_cycle(state["cycles"])
+        
         if not success:
-            display.sleep()
-            break
+            # The error stays on screen until a retry succeeds; rest the panel meanwhile.
+            _sleep_panel(display)
+            utime.sleep_ms(sleep_ms)
+            _wake_panel(display)
+            continue
         
-        utime.sleep_ms(check_interval_s * 1000)
+        utime.sleep_ms(sleep_ms)
 
 
 main()
@@ -1,11 +1,19 @@
+import frame_delta
 from waveshare_epd_4in2b import EPD_4in2_B
 
 
 class PinkyDisplay:
-    def __init__(self):
-        self._epd = EPD_4in2_B()
+    def __init__(self, clear_panel: bool = True, busy_wait: str = "irq"):
+        # When waking from deep sleep the panel still shows the last frame, so
+        # skip the full clear refresh unless we are starting from scratch.
+        self._epd = EPD_4in2_B(clear_panel=clear_panel, busy_wait=busy_wait)
+        # CRC of the frame in the buffers, once main.py has drawn it in this boot; 0 if
+        # unknown. RAM doesn't survive deep sleep, so after a wake the buffers hold
+        # nothing a delta could be applied to, whatever the state file says is on the panel.
+        self.frame_crc = 0
 
     def clear(self):
+        self.frame_crc = 0
         self._epd.imageblack.fill(0xFF)
         self._epd.imagered.fill(0x00)
 
@@ -18,6 +26,7 @@ class PinkyDisplay:
     def set_black_framebuffer_bytes(self, buf: bytes):
         if len(buf) != len(self._epd.buffer_black):
             raise ValueError("Unexpected framebuffer size")
+        self.frame_crc = 0
         self._epd.buffer_black[:] = buf
         self._epd.buffer_red[:] = b"\x00" * len(self._epd.buffer_red)
 
@@ -31,12 +40,33 @@ class PinkyDisplay:
         if len(buf) != expected_size:
             raise ValueError(f"Expected {expected_size} bytes for 3-color framebuffer, got {len(buf)}")
         
+        self.frame_crc = 0
         black_size = len(self._epd.buffer_black)
         self._epd.buffer_black[:] = buf[:black_size]
         self._epd.buffer_red[:] = buf[black_size:]
 
+    def supports_partial(self) -> bool:
+        return self._epd.flag == 1
+
+    def apply_delta(self, delta: bytes, expected_crc: int = 0) -> tuple:
+        """Apply a Fletcher frame delta to the framebuffers without touching the panel.
+        
+        The delta must be based on the frame currently in the buffers.
+        Returns (new_crc: int, rects: list)
+        """
+        # A failed delta may leave the buffers partly patched.
+        self.frame_crc = 0
+        return frame_delta.apply_delta(delta, self._epd.buffer_black, self._epd.buffer_red, expected_crc=expected_crc)
+
+    def show_windows(self, rects, full_refresh: bool = False):
+        self._epd.EPD_4IN2B_DisplayWindows(self._epd.buffer_black, self._epd.buffer_red, rects, full_refresh=full_refresh)
+
     def show(self):
         self._epd.EPD_4IN2B_Display(self._epd.buffer_black, self._epd.buffer_red)
 
     def sleep(self):
         self._epd.Sleep()
+
+    def wake(self):
+        """Re-initialise the panel after sleep() without clearing what it shows."""
+        self._epd.EPD_4IN2B_Init()
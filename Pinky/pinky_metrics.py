@@ -0,0 +1,102 @@
+import json
+
+import utime
+
+
+DEFAULT_METRICS_FILENAME = "pinky_metrics.json"
+DEFAULT_RING_SIZE = 24
+
+# Current cycle: counters are plain totals, timers are [count, total_us, max_us].
+_counters = {}
+_timers = {}
+# Finished cycles, oldest first, capped at _ring_size.
+_ring = []
+_ring_size = DEFAULT_RING_SIZE
+
+
+class _Span:
+    def __init__(self, name: str):
+        self._name = name
+        self._start = 0
+
+    def __enter__(self):
+        self._start = utime.ticks_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record_us(self._name, utime.ticks_diff(utime.ticks_us(), self._start))
+        return False
+
+
+def span(name: str) -> _Span:
+    """Time a block with ticks_us: `with pinky_metrics.span("wifi_connect"): ...`"""
+    return _Span(name)
+
+
+def record_us(name: str, elapsed_us: int):
+    t = _timers.get(name)
+    if t is None:
+        _timers[name] = [1, elapsed_us, elapsed_us]
+        return
+    t[0] += 1
+    t[1] += elapsed_us
+    if elapsed_us > t[2]:
+        t[2] = elapsed_us
+
+
+def count(name: str, n: int = 1):
+    _counters[name] = _counters.get(name, 0) + n
+
+
+def end_cycle():
+    """Move the current cycle's counters and timers into the ring buffer."""
+    global _counters, _timers
+    _ring.append({"c": _counters, "t": _timers})
+    while len(_ring) > _ring_size:
+        _ring.pop(0)
+    _counters = {}
+    _timers = {}
+
+
+def load(filename: str = DEFAULT_METRICS_FILENAME, ring_size: int = DEFAULT_RING_SIZE):
+    """Restore the ring buffer from flash (e.g. after a deep-sleep reset)."""
+    global _ring, _ring_size
+    _ring_size = ring_size
+    try:
+        with open(filename, "r") as f:
+            stored = json.load(f)
+    except Exception:
+        return
+    if isinstance(stored, list):
+        _ring = stored[-_ring_size:]
+
+
+def flush(filename: str = DEFAULT_METRICS_FILENAME):
+    with open(filename, "w") as f:
+        json.dump(_ring, f)
+
+
+def summary() -> dict:
+    """Totals over every cycle in the ring buffer, small enough to upload.
+    
+    Timers are reported in milliseconds as [count, total_ms, max_ms].
+    """
+    counters = {}
+    timers = {}
+    for cycle in _ring:
+        for name, value in cycle.get("c", {}).items():
+            counters[name] = counters.get(name, 0) + value
+        for name, t in cycle.get("t", {}).items():
+            agg = timers.get(name)
+            if agg is None:
+                timers[name] = [t[0], t[1], t[2]]
+            else:
+                agg[0] += t[0]
+                agg[1] += t[1]
+                if t[2] > agg[2]:
+                    agg[2] = t[2]
+    return {
+        "cycles": len(_ring),
+        "counters": counters,
+        "timers_ms": {name: [t[0], t[1] // 1000, t[2] // 1000] for name, t in timers.items()},
+    }
@@ -0,0 +1,65 @@
+import json
+import os
+
+
+DEFAULT_STATE_FILENAME = "pinky_state.json"
+
+
+def default_state() -> dict:
+    return {
+        "last_modified": "",
+        "frame_crc": 0,
+        "cycles": 0,
+        "updates": 0,
+        "failures": 0,
+        "failure_streak": 0,
+        "next_check_s": 0,
+        "partial_refreshes": 0,
+    }
+
+
+def _read_json(filename: str):
+    try:
+        with open(filename, "r") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def load_state(filename: str = DEFAULT_STATE_FILENAME) -> dict:
+    """Load persisted state from flash, falling back to defaults if missing or corrupt.
+    
+    If only the temp file is there (power lost between save_state's remove and rename on
+    a filesystem that can't rename over a file), it holds the latest complete state.
+    """
+    state = default_state()
+    stored = _read_json(filename)
+    if stored is None:
+        stored = _read_json(filename + ".tmp")
+    if stored is None:
+        return state
+
+    if isinstance(stored, dict):
+        for key in state:
+            if key in stored:
+                state[key] = stored[key]
+    return state
+
+
+def save_state(state: dict, filename: str = DEFAULT_STATE_FILENAME):
+    """Write state to flash via a temp file and rename, so a brownout mid-write
+    leaves the previous state intact."""
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "w") as f:
+        json.dump(state, f)
+    try:
+        # littlefs (the Pico default) replaces the old file atomically.
+        os.rename(tmp_filename, filename)
+    except OSError:
+        # FAT won't rename over an existing file. load_state falls back to the temp
+        # file if power is lost before the rename.
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+        os.rename(tmp_filename, filename)
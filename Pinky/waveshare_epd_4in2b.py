@@ -1,7 +1,10 @@
 from machine import Pin, SPI
 import framebuf
+import machine
 import utime
 
+import pinky_metrics
+
 EPD_WIDTH = 400
 EPD_HEIGHT = 300
 
@@ -12,9 +15,25 @@ DC_PIN = 8
 CS_PIN = 9
 BUSY_PIN = 13
 
+# A full 3-colour refresh takes ~15s; anything much longer means the panel has stopped responding.
+BUSY_TIMEOUT_MS = 40000
+# Upper bound on each lightsleep while waiting for the BUSY IRQ. Not every rp2 firmware
+# wakes lightsleep on a GPIO IRQ; where it doesn't, the release is only seen when a slice
+# ends, so this is also the worst-case overshoot per wait. 50ms keeps that well under the
+# old 100ms poll while still sleeping in long stretches through a ~15s refresh.
+BUSY_SLEEP_SLICE_MS = 50
+BUSY_POLL_MS = 10
+
+
+class BusyTimeout(Exception):
+    pass
+
 
 class EPD_4in2_B:
-    def __init__(self):
+    def __init__(self, clear_panel=True, busy_wait="irq", busy_timeout_ms=BUSY_TIMEOUT_MS):
+        self.busy_wait = busy_wait
+        self.busy_timeout_ms = busy_timeout_ms
+        self._busy_released = False
         self.reset_pin = Pin(RST_PIN, Pin.OUT)
         self.busy_pin = Pin(BUSY_PIN, Pin.IN, Pin.PULL_UP)
         self.cs_pin = Pin(CS_PIN, Pin.OUT)
@@ -33,8 +52,9 @@ class EPD_4in2_B:
         self.imagered = framebuf.FrameBuffer(self.buffer_red, self.width, self.height, framebuf.MONO_HLSB)
 
         self.EPD_4IN2B_Init()
-        self.EPD_4IN2B_Clear()
-        utime.sleep_ms(500)
+        if clear_panel:
+            self.EPD_4IN2B_Clear()
+            utime.sleep_ms(500)
 
     def digital_write(self, pin, value):
         pin.value(value)
@@ -98,13 +118,50 @@ class EPD_4in2_B:
         self.digital_write(self.cs_pin, 1)
         return j
 
+    def _busy_irq_handler(self, pin):
+        self._busy_released = True
+
+    def _read_busy_irq(self, busy_level, start):
+        """Sleep until the BUSY pin leaves busy_level, woken by a pin IRQ on the release edge."""
+        trigger = Pin.IRQ_FALLING if busy_level == 1 else Pin.IRQ_RISING
+        self._busy_released = False
+        self.busy_pin.irq(trigger=trigger, handler=self._busy_irq_handler)
+        try:
+            while not self._busy_released and self.digital_read(self.busy_pin) == busy_level:
+                remaining = self.busy_timeout_ms - utime.ticks_diff(utime.ticks_ms(), start)
+                if remaining <= 0:
+                    raise BusyTimeout("EPD busy timeout")
+                machine.lightsleep(min(remaining, BUSY_SLEEP_SLICE_MS))
+        finally:
+            self.busy_pin.irq(handler=None)
+
+    def _read_busy_poll(self, busy_level, start):
+        while self.digital_read(self.busy_pin) == busy_level:
+            if utime.ticks_diff(utime.ticks_ms(), start) > self.busy_timeout_ms:
+                raise BusyTimeout("EPD busy timeout")
+            utime.sleep_ms(BUSY_POLL_MS)
+
     def ReadBusy(self):
-        if self.flag == 1:
-            while self.digital_read(self.busy_pin) == 1:
-                self.delay_ms(100)
-        else:
-            while self.digital_read(self.busy_pin) == 0:
-                self.delay_ms(100)
+        # The SSD1683-class controller (flag == 1) holds BUSY high while busy; the older one holds it low.
+        busy_level = 1 if self.flag == 1 else 0
+        if self.digital_read(self.busy_pin) != busy_level:
+            return
+
+        start = utime.ticks_ms()
+        start_us = utime.ticks_us()
+        try:
+            if self.busy_wait == "irq":
+                try:
+                    self._read_busy_irq(busy_level, start)
+                    return
+                except BusyTimeout:
+                    raise
+                except Exception:
+                    # No IRQ/lightsleep support on this port or pin: fall back to polling.
+                    pass
+            self._read_busy_poll(busy_level, start)
+        finally:
+            pinky_metrics.record_us("epd_busy", utime.ticks_diff(utime.ticks_us(), start_us))
 
     def TurnOnDisplay(self):
         if self.flag == 1:
@@ -185,6 +242,7 @@ class EPD_4in2_B:
         self.TurnOnDisplay()
 
     def EPD_4IN2B_Display(self, blackImage, redImage):
+        start_us = utime.ticks_us()
         if self.flag == 1:
             self.send_command(0x24)
             self.send_data1(blackImage)
@@ -206,8 +264,71 @@ class EPD_4in2_B:
                 for i in range(0, wide):
                     self.send_data(~redImage[i + j * wide])
 
+        pinky_metrics.record_us("epd_spi", utime.ticks_diff(utime.ticks_us(), start_us))
         self.TurnOnDisplay()
 
+    def _set_window(self, x_byte, y, w_bytes, h):
+        self.send_command(0x44)
+        self.send_data(x_byte)
+        self.send_data(x_byte + w_bytes - 1)
+
+        self.send_command(0x45)
+        self.send_data(y % 256)
+        self.send_data(y // 256)
+        self.send_data((y + h - 1) % 256)
+        self.send_data((y + h - 1) // 256)
+
+    def _set_cursor(self, x_byte, y):
+        self.send_command(0x4E)
+        self.send_data(x_byte)
+        self.send_command(0x4F)
+        self.send_data(y % 256)
+        self.send_data(y // 256)
+
+    def TurnOnDisplayPartial(self):
+        self.send_command(0x22)
+        self.send_data(0xFF)
+        self.send_command(0x20)
+        self.ReadBusy()
+
+    def EPD_4IN2B_DisplayWindows(self, blackImage, redImage, rects, full_refresh=False):
+        """Write only the given (x_byte, y, w_bytes, h) windows of the buffers to panel RAM,
+        then refresh. Only supported on the newer controller (flag == 1)."""
+        if self.flag != 1:
+            raise ValueError("Partial windows need the SSD1683 controller")
+
+        start_us = utime.ticks_us()
+        wide = self.width // 8 if (self.width % 8 == 0) else (self.width // 8 + 1)
+        for x_byte, y, w_bytes, h in rects:
+            self._set_window(x_byte, y, w_bytes, h)
+
+            self._set_cursor(x_byte, y)
+            self.send_command(0x24)
+            black_rows = bytearray(w_bytes * h)
+            for row in range(h):
+                start = (y + row) * wide + x_byte
+                black_rows[row * w_bytes:(row + 1) * w_bytes] = blackImage[start:start + w_bytes]
+            self.send_data1(black_rows)
+
+            self._set_cursor(x_byte, y)
+            self.send_command(0x26)
+            red_rows = bytearray(w_bytes * h)
+            for row in range(h):
+                start = (y + row) * wide + x_byte
+                for i in range(w_bytes):
+                    red_rows[row * w_bytes + i] = ~redImage[start + i] & 0xFF
+            self.send_data1(red_rows)
+
+        # Restore the full-screen window for the next full update.
+        self._set_window(0, 0, wide, self.height)
+        self._set_cursor(0, 0)
+        pinky_metrics.record_us("epd_spi", utime.ticks_diff(utime.ticks_us(), start_us))
+
+        if full_refresh:
+            self.TurnOnDisplay()
+        else:
+            self.TurnOnDisplayPartial()
+
     def Sleep(self):
         if self.flag == 1:
             self.send_command(0x10)
@@ -1,6 +1,8 @@
 import network
 import utime
 
+import pinky_metrics
+
 
 def connect_wifi(ssid: str, password: str, timeout_s: int = 30) -> bool:
     """Connect to WiFi network. Returns True if successful, False otherwise."""
@@ -10,13 +12,15 @@ def connect_wifi(ssid: str, password: str, timeout_s: int = 30) -> bool:
     if wlan.isconnected():
         return True
     
-    wlan.connect(ssid, password)
-    
-    start = utime.time()
-    while not wlan.isconnected():
-        if utime.time() - start > timeout_s:
-            return False
-        utime.sleep_ms(500)
+    with pinky_metrics.span("wifi_connect"):
+        wlan.connect(ssid, password)
+        
+        start = utime.time()
+        while not wlan.isconnected():
+            if utime.time() - start > timeout_s:
+                pinky_metrics.count("wifi_connect_failed")
+                return False
+            utime.sleep_ms(500)
     
     return True
 